@@ -5,12 +5,12 @@ from datetime import datetime, timedelta
 import time
 import json
 import threading
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, replace
 from typing import Dict, List, Optional, Tuple, Any
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class AdaptiveSamplingConfig:
-    """Configuración para el sistema de muestreo adaptativo"""
+    """Configuración para el sistema de muestreo adaptativo (inmutable: usar replace())"""
     
     # Configuración básica
     base_interval: int = 8           # Intervalo base de frames
@@ -85,7 +85,7 @@ class AdaptiveSamplingConfig:
     
     def copy(self) -> "AdaptiveSamplingConfig":
         """Crea una copia de la configuración"""
-        return AdaptiveSamplingConfig(**asdict(self))
+        return replace(self)
 
 
 class ActivityScoreCalculator:
@@ -98,7 +98,7 @@ class ActivityScoreCalculator:
         self.confidence_history = deque(maxlen=config.history_window)
         
     def add_frame_data(self, detections: List[Dict], has_movement: bool = True):
-        """Agrega datos de un frame para el cálculo de actividad"""
+        """Agrega datos de un frame para el cálculo de actividad (solo se lee 'conf' de cada detección)"""
         
         # Filtrar detecciones por confianza
         valid_detections = [
@@ -261,6 +261,11 @@ class AdaptiveSamplingController:
         self.processed_frames = 0
         self.skipped_frames = 0
         
+        # Callback opcional on_interval_change(intervalo): se invoca solo cuando
+        # cambia el intervalo aplicado, para que el consumidor cachee el valor
+        self.on_interval_change = None
+        self._last_interval = self.config.base_interval
+        
         # Estadísticas
         self.stats_history = deque(maxlen=1000)
         self.start_time = time.time()
@@ -302,6 +307,8 @@ class AdaptiveSamplingController:
             trend = self.activity_calculator.get_trend()
             target_interval = self.interval_calculator.calculate_target_interval(activity_score, trend)
             current_interval = self.interval_calculator.update_interval(target_interval)
+            if current_interval != self._last_interval:
+                self._notify_interval_change(current_interval)
             
             # Determinar si procesar
             should_process = (self.frame_counter % current_interval) == 0
@@ -316,6 +323,50 @@ class AdaptiveSamplingController:
             
             return should_process
     
+    def update_activity(self, detections: List[Dict] = None, has_movement: bool = True, frames: int = 1) -> int:
+        """Actualiza la actividad y devuelve el intervalo a aplicar desde el frame actual
+
+        Para consumidores que consultan al controlador una sola vez por ventana de
+        salto: `frames` son los frames transcurridos desde la llamada anterior
+        (el analizado entonces y los saltados después). Se cuentan como tales, y
+        la ráfaga y el suavizado avanzan un paso por frame, igual que con
+        should_process_frame() llamado en cada frame.
+        """
+        
+        with self.lock:
+            frames = max(1, frames)
+            self.frame_counter += frames
+            self.processed_frames += 1
+            self.skipped_frames += frames - 1
+            
+            if not self.enabled:
+                return self.config.base_interval
+            
+            # Actualizar datos de actividad
+            if detections is not None:
+                self.activity_calculator.add_frame_data(detections, has_movement)
+            
+            # Calcular nuevo intervalo. Tras max_interval + burst_duration pasos la
+            # ráfaga terminó y el suavizado alcanzó el objetivo: no hace falta seguir
+            activity_score = self.activity_calculator.calculate_activity_score()
+            trend = self.activity_calculator.get_trend()
+            target_interval = self.interval_calculator.calculate_target_interval(activity_score, trend)
+            for _ in range(min(frames, self.config.max_interval + self.config.burst_duration)):
+                current_interval = self.interval_calculator.update_interval(target_interval)
+            if current_interval != self._last_interval:
+                self._notify_interval_change(current_interval)
+            
+            # Guardar estadísticas
+            self._record_stats(activity_score, current_interval, target_interval, True)
+            
+            return current_interval
+    
+    def _notify_interval_change(self, interval: int):
+        """Registra el nuevo intervalo aplicado y avisa al callback si existe"""
+        self._last_interval = interval
+        if self.on_interval_change:
+            self.on_interval_change(interval)
+    
     def _record_stats(self, activity_score: float, current_interval: int, target_interval: int, processed: bool):
         """Registra estadísticas del frame"""
         
@@ -412,6 +463,7 @@ class AdaptiveSamplingController:
             self.config = new_config.copy()
             self.activity_calculator = ActivityScoreCalculator(self.config)
             self.interval_calculator = AdaptiveIntervalCalculator(self.config)
+            self._notify_interval_change(self.config.base_interval)
     
     def export_config(self) -> Dict[str, Any]:
         """Exporta la configuración actual"""
@@ -0,0 +1,59 @@
+# core/box_records.py - Detecciones del visualizador como registros NumPy
+"""
+El visualizador entrega cada detección como un dict ({'bbox', 'cls', 'conf', 'id'}).
+Para filtrar por movimiento y por celda sin bucles Python, las columnas numéricas
+se copian a un array estructurado (`BOX_DTYPE`). Los valores que no son numéricos
+(None, cadenas) no se convierten: `cls` queda en -1 y `conf` en 0, y el id del
+tracker nunca pasa por el array, se conserva tal cual en el dict original.
+"""
+
+import numpy as np
+
+# bbox en float para no truncar coordenadas antes de calcular los centros
+BOX_DTYPE = np.dtype([('bbox', '4f8'), ('cls', 'i8'), ('conf', 'f8')])
+
+
+def _int_or(value, default=-1):
+    """`value` como int si es un entero (o un float entero), si no `default`"""
+    if isinstance(value, bool):
+        return default
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    if isinstance(value, (float, np.floating)) and float(value).is_integer():
+        return int(value)
+    return default
+
+
+def _float_or(value, default=0.0):
+    """`value` como float si es numérico, si no `default`"""
+    if isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, bool):
+        return float(value)
+    return default
+
+
+def boxes_to_records(box_dicts):
+    """Array `BOX_DTYPE` con una fila por dict de `box_dicts`, en el mismo orden"""
+    return np.fromiter(
+        ((b.get('bbox', (0, 0, 0, 0)), _int_or(b.get('cls')), _float_or(b.get('conf', 0)))
+         for b in box_dicts),
+        dtype=BOX_DTYPE, count=len(box_dicts)
+    )
+
+
+def box_centers(bboxes):
+    """Centros enteros (n, 2) de bboxes (n, 4), truncados como int((x1 + x2) / 2)"""
+    return np.trunc((bboxes[:, :2] + bboxes[:, 2:]) / 2).astype(np.int64)
+
+
+def alert_tuples(box_dicts, rows, centers):
+    """Tuplas (x1, y1, x2, y2, cls, cx, cy, track_id, conf) que espera GestorAlertas
+
+    `rows` son los índices de `box_dicts` a incluir; bbox, cls, id y conf se toman
+    del dict original, sin pasar por el array de registros.
+    """
+    tuples = []
+    for i, (cx, cy) in zip(rows.tolist(), centers[rows].tolist()):
+        b = box_dicts[i]
+        x1, y1, x2, y2 = b.get('bbox', (0, 0, 0, 0))
+        tuples.append((x1, y1, x2, y2, b.get('cls'), cx, cy, b.get('id'), b.get('conf', 0)))
+    return tuples
@@ -1,6 +1,10 @@
 from PyQt6.QtCore import QThread, pyqtSignal, QMutex, QWaitCondition
 from collections import defaultdict
 
+import numpy as np
+
+from core.geom_numba import sides
+
 class CrossLineCounter(QThread):
     """Count objects crossing a user defined line without blocking the UI.
 
@@ -55,15 +59,15 @@ class CrossLineCounter(QThread):
         line_y1 = y1_rel * height
         line_x2 = x2_rel * width
         line_y2 = y2_rel * height
-        dx = line_x2 - line_x1
-        dy = line_y2 - line_y1
-        for b in boxes:
+        # Side of the line for every box center in a single kernel call
+        bboxes = np.array([b.get('bbox', (0, 0, 0, 0)) for b in boxes],
+                          dtype=np.float64).reshape(-1, 4)
+        cx = (bboxes[:, 0] + bboxes[:, 2]) / 2
+        cy = (bboxes[:, 1] + bboxes[:, 3]) / 2
+        box_sides = sides(cx, cy, line_x1, line_y1, line_x2, line_y2).tolist()
+        for b, sign in zip(boxes, box_sides):
             tid = b.get('id')
-            x1, y1, x2, y2 = b.get('bbox', (0, 0, 0, 0))
-            cx = (x1 + x2) / 2
-            cy = (y1 + y2) / 2
-            value = (cx - line_x1) * dy - (cy - line_y1) * dx
-            side = 'pos' if value >= 0 else 'neg'
+            side = 'pos' if sign > 0 else 'neg'
 
             prev_side = self.prev_sides.get(tid)
             crossed = prev_side is not None and prev_side != side
@@ -0,0 +1,36 @@
+# core/frame_numba.py - Copia de filas de imagen a buffers preasignados
+"""
+Copia un frame RGB888 empaquetado por filas (con posible relleno al final de
+cada línea, `bytesPerLine`) a un array (alto, ancho, 3) ya reservado. Con Numba
+la copia se reparte por filas entre hilos (ver core.numba_compat); sin Numba se
+usa una vista con stride de NumPy, que hace la misma copia sin bucles Python.
+"""
+
+import numpy as np
+
+from core.numba_compat import njit, prange, NUMBA_AVAILABLE
+
+
+@njit(parallel=True, cache=True)
+def _copy_rows_kernel(src, dst, stride):
+    """Copiar cada fila de `src` (1-D, `stride` bytes por fila) a `dst` (alto, ancho*canales)"""
+    h, row_bytes = dst.shape
+    for y in prange(h):
+        base = y * stride
+        for x in range(row_bytes):
+            dst[y, x] = src[base + x]
+
+
+def copy_rows(src, dst, stride):
+    """Copiar el buffer plano `src` con `stride` bytes por línea al array contiguo `dst` (h, w, c)"""
+    h = dst.shape[0]
+    flat_dst = dst.reshape(h, -1)
+    if NUMBA_AVAILABLE:
+        _copy_rows_kernel(src, flat_dst, stride)
+    else:
+        np.copyto(flat_dst, src[:h * stride].reshape(h, stride)[:, :flat_dst.shape[1]])
+
+
+# Compilar al importar el módulo, fuera del camino caliente
+if NUMBA_AVAILABLE:
+    _copy_rows_kernel(np.zeros(4, dtype=np.uint8), np.empty((1, 3), dtype=np.uint8), 4)
@@ -0,0 +1,44 @@
+# core/geom_numba.py - Kernels geométricos 2D para la línea de conteo
+"""
+Distancia punto-segmento y lado de una recta, compilados con Numba cuando está
+disponible (ver core.numba_compat). Reciben floats y arrays planos para no
+depender de QPointF ni de diccionarios en el bucle caliente.
+"""
+
+import math
+
+import numpy as np
+
+from core.numba_compat import njit
+
+
+@njit(cache=True, fastmath=True)
+def point_seg_dist(px, py, ax, ay, bx, by):
+    """Distancia euclídea de (px, py) al segmento (ax, ay)-(bx, by).
+
+    Un segmento degenerado (a == b) usa la distancia Manhattan al punto a.
+    """
+    dx = bx - ax
+    dy = by - ay
+    if dx == 0.0 and dy == 0.0:
+        return abs(px - ax) + abs(py - ay)
+    t = ((px - ax) * dx + (py - ay) * dy) / (dx * dx + dy * dy)
+    t = 0.0 if t < 0.0 else (1.0 if t > 1.0 else t)
+    return math.hypot(px - (ax + t * dx), py - (ay + t * dy))
+
+
+@njit(cache=True, fastmath=True)
+def sides(cx, cy, ax, ay, bx, by):
+    """Lado de la recta a->b en que cae cada punto (cx[i], cy[i]): 1 o -1 (int8)"""
+    dx = bx - ax
+    dy = by - ay
+    out = np.empty(cx.shape[0], dtype=np.int8)
+    for i in range(cx.shape[0]):
+        value = (cx[i] - ax) * dy - (cy[i] - ay) * dx
+        out[i] = 1 if value >= 0.0 else -1
+    return out
+
+
+# Compilar al importar el módulo, fuera del camino caliente
+point_seg_dist(0.0, 0.0, 0.0, 0.0, 1.0, 1.0)
+sides(np.zeros(1), np.zeros(1), 0.0, 0.0, 1.0, 1.0)
@@ -0,0 +1,115 @@
+# core/log_writer.py - Escritura de logs a archivo en segundo plano
+"""
+Los widgets registran eventos en un archivo de texto compartido. Abrir, escribir
+y cerrar el archivo en cada llamada bloquea el hilo de la GUI; aquí las líneas se
+encolan y un hilo por archivo las escribe por lotes con un único descriptor
+abierto. Usar `get_line_writer(path)` para compartir el escritor entre widgets.
+"""
+
+import atexit
+import queue
+import threading
+
+_STOP = object()
+
+
+class AsyncLineWriter:
+    """Escritor de líneas en modo append, con cola y un hilo dedicado"""
+
+    def __init__(self, path, batch_size=64):
+        self.path = path
+        self.batch_size = batch_size
+        self._queue = queue.Queue()
+        self._error_reported = False
+        self._thread = threading.Thread(target=self._writer_loop, daemon=True)
+        self._thread.start()
+
+    def write(self, line):
+        """Encolar una línea (debe incluir el salto de línea); no bloquea.
+
+        Si el hilo terminó (no se pudo abrir el archivo o ya se cerró el escritor)
+        la línea se escribe directamente, para no acumularla en una cola sin lector.
+        """
+        if self._thread.is_alive():
+            self._queue.put_nowait(line)
+            return
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+        except OSError as e:
+            self._report_error(e)
+
+    def flush(self):
+        """Esperar a que todas las líneas encoladas estén escritas en el archivo"""
+        if self._thread.is_alive():
+            self._queue.join()
+
+    def close(self, timeout=2.0):
+        """Escribir lo pendiente y terminar el hilo"""
+        if self._thread.is_alive():
+            self._queue.put_nowait(_STOP)
+            self._thread.join(timeout)
+
+    def _report_error(self, error):
+        """Informar del primer error de escritura en el archivo; los siguientes se omiten"""
+        if not self._error_reported:
+            self._error_reported = True
+            print(f"Error escribiendo log en {self.path}: {error}")
+
+    def _writer_loop(self):
+        try:
+            f = open(self.path, "a", encoding="utf-8")
+        except OSError as e:
+            # Sin archivo el hilo termina; write() pasa a escribir directamente.
+            # Lo ya encolado se descarta para no dejar la cola (ni flush) colgados
+            self._report_error(e)
+            while True:
+                try:
+                    self._queue.get_nowait()
+                except queue.Empty:
+                    return
+                self._queue.task_done()
+        with f:
+            while True:
+                batch = [self._queue.get()]
+                while len(batch) < self.batch_size:
+                    try:
+                        batch.append(self._queue.get_nowait())
+                    except queue.Empty:
+                        break
+                stop = _STOP in batch
+                try:
+                    f.write("".join(line for line in batch if line is not _STOP))
+                    f.flush()
+                except Exception as e:
+                    self._report_error(e)
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+                if stop:
+                    return
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def get_line_writer(path):
+    """Escritor compartido para `path`, creado la primera vez que se pide"""
+    writer = _writers.get(path)
+    if writer is None:
+        with _writers_lock:
+            writer = _writers.get(path)
+            if writer is None:
+                writer = _writers[path] = AsyncLineWriter(path)
+    return writer
+
+
+@atexit.register
+def close_all_writers():
+    """Vaciar y cerrar todos los escritores al salir del proceso"""
+    with _writers_lock:
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.close()
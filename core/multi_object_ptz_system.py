@@ -10,17 +10,41 @@ Características:
 """
 
 import time
+import heapq
+import queue
 import numpy as np
 import threading
 from enum import Enum
-from typing import Optional, Dict, List, Tuple, Callable
+from typing import Optional, Dict, List, Tuple, Callable, Any, Deque
 from dataclasses import dataclass, field
+from collections import deque
 from datetime import datetime
 import math
 import logging
 
+from core.numba_compat import njit
+
+# Importar ONVIF una sola vez por proceso, no en cada construcción del tracker
+try:
+    from onvif import ONVIFCamera
+except ImportError:
+    ONVIFCamera = None
+
+# Errores esperables de una llamada SOAP a la cámara (onvif-zeep los envuelve en ONVIFError)
+try:
+    from onvif import ONVIFError
+    PTZ_COMMAND_ERRORS = (ONVIFError, OSError)
+except ImportError:
+    PTZ_COMMAND_ERRORS = (Exception,)
+
+# Asignación óptima (húngaro) si scipy está disponible; si no, asignación voraz
+try:
+    from scipy.optimize import linear_sum_assignment
+except ImportError:
+    linear_sum_assignment = None
+
 # ===== CORRECCIÓN: Definir ObjectPosition y TrackingState localmente =====
-@dataclass
+@dataclass(slots=True)
 class ObjectPosition:
     """Representa la posición de un objeto detectado en el frame"""
     cx: float          # Centro X normalizado (0-1)
@@ -33,21 +57,36 @@ class ObjectPosition:
     frame_h: int = 1080    # Alto del frame en píxeles
     object_class: str = "unknown"
     
+    # Valores derivados, calculados una sola vez al crear la posición
+    _pixels: tuple = field(init=False, repr=False, compare=False)
+    _area: float = field(init=False, repr=False, compare=False)
+    
+    def __post_init__(self):
+        half_w = self.width / 2
+        half_h = self.height / 2
+        self._pixels = (int((self.cx - half_w) * self.frame_w),
+                        int((self.cy - half_h) * self.frame_h),
+                        int((self.cx + half_w) * self.frame_w),
+                        int((self.cy + half_h) * self.frame_h))
+        self._area = (self.width * self.frame_w) * (self.height * self.frame_h)
+    
     def to_pixels(self) -> tuple:
         """Convertir coordenadas normalizadas a píxeles"""
-        x1 = int((self.cx - self.width/2) * self.frame_w)
-        y1 = int((self.cy - self.height/2) * self.frame_h)
-        x2 = int((self.cx + self.width/2) * self.frame_w)
-        y2 = int((self.cy + self.height/2) * self.frame_h)
-        return (x1, y1, x2, y2)
+        return self._pixels
     
     def get_area(self) -> float:
         """Obtener área del objeto en píxeles cuadrados"""
-        return (self.width * self.frame_w) * (self.height * self.frame_h)
+        return self._area
+    
+    def distance_to_center_sq(self) -> float:
+        """Calcular distancia al cuadrado al centro del frame (para comparaciones)"""
+        dx = self.cx - 0.5
+        dy = self.cy - 0.5
+        return dx * dx + dy * dy
     
     def distance_to_center(self) -> float:
         """Calcular distancia al centro del frame (0-1)"""
-        return math.sqrt((self.cx - 0.5)**2 + (self.cy - 0.5)**2)
+        return math.hypot(self.cx - 0.5, self.cy - 0.5)
 
 class TrackingState(Enum):
     """Estados del sistema de seguimiento PTZ"""
@@ -123,6 +162,9 @@ class MultiObjectConfig:
     min_zoom_level: float = 0.0          # Zoom mínimo
     max_zoom_level: float = 1.0          # Zoom máximo
     zoom_padding: float = 0.1            # Padding alrededor del objeto
+    zoom_hysteresis_enter: float = 0.08  # Diferencia de zoom que inicia un ajuste
+    zoom_hysteresis_exit: float = 0.04   # Diferencia de zoom que termina el ajuste
+    zoom_cmd_min_interval_s: float = 0.5 # Tiempo mínimo entre comandos de zoom
     
     # === FILTROS Y UMBRALES ===
     min_confidence_threshold: float = 0.5    # Confianza mínima para detectar
@@ -136,6 +178,9 @@ class MultiObjectConfig:
     max_tilt_speed: float = 0.8          # Velocidad máxima de inclinación
     movement_smoothing: float = 0.5      # Factor de suavizado (0-1)
     tracking_smoothing: float = 0.3      # Suavizado del seguimiento
+    ptz_command_epsilon: float = 0.02    # Cambio mínimo de velocidad para reenviar ContinuousMove
+    ptz_flush_timeout_ms: int = 250      # Espera máxima de un comando acumulado (ms)
+    ptz_innovation_gate: float = 0.0     # No reenviar si la última innovación de Kalman es menor (0 = siempre)
     
     # === CONFIGURACIÓN AVANZADA ===
     prediction_enabled: bool = True      # Habilitar predicción de movimiento
@@ -151,18 +196,146 @@ class MultiObjectConfig:
             assert self.min_switch_interval > 0
             assert self.alternating_enabled or self.secondary_follow_time > 0
             assert self.min_zoom_level <= self.max_zoom_level
+            assert 0 <= self.zoom_hysteresis_exit <= self.zoom_hysteresis_enter
             assert 0 < self.max_objects_to_track <= 10
+            assert self.ptz_command_epsilon >= 0 and self.ptz_flush_timeout_ms >= 0
+            assert self.ptz_innovation_gate >= 0
             return True
         except AssertionError:
             return False
 
-@dataclass
+# Número de posiciones recientes que conserva cada objeto rastreado
+MAX_POSITION_HISTORY = 20
+
+# Número de comandos PTZ recientes que conserva el tracker para estadísticas
+PTZ_HISTORY_SIZE = 100
+
+# Columnas del buffer circular numérico de cada objeto rastreado
+RING_CX, RING_CY, RING_W, RING_H, RING_CONF, RING_TS = range(6)
+
+# ===== FILTRO DE KALMAN DE VELOCIDAD CONSTANTE =====
+# Estado [cx, cy, vx, vy] en coordenadas normalizadas; se mide solo [cx, cy]
+KF_MEASUREMENT_VAR = 0.01 ** 2      # Varianza de la posición detectada (R)
+KF_ACCELERATION_VAR = 0.5 ** 2      # Intensidad del ruido de aceleración (Q)
+KF_INITIAL_VELOCITY_VAR = 1.0       # Incertidumbre inicial de la velocidad
+
+def _kf_transition(dt) -> np.ndarray:
+    """Matrices de transición F (..., 4, 4) para pasos de dt segundos (escalar o array)"""
+    dt = np.asarray(dt, dtype=np.float32)
+    F = np.broadcast_to(np.eye(4, dtype=np.float32), dt.shape + (4, 4)).copy()
+    F[..., 0, 2] = dt
+    F[..., 1, 3] = dt
+    return F
+
+def _kf_process_noise(dt) -> np.ndarray:
+    """Ruido de proceso Q (..., 4, 4) de aceleración blanca discreta para pasos de dt segundos"""
+    dt = np.asarray(dt, dtype=np.float32)
+    dt2 = dt * dt
+    Q = np.zeros(dt.shape + (4, 4), dtype=np.float32)
+    Q[..., 0, 0] = Q[..., 1, 1] = dt2 * dt2 / 4.0 * KF_ACCELERATION_VAR
+    Q[..., 0, 2] = Q[..., 2, 0] = Q[..., 1, 3] = Q[..., 3, 1] = dt2 * dt / 2.0 * KF_ACCELERATION_VAR
+    Q[..., 2, 2] = Q[..., 3, 3] = dt2 * KF_ACCELERATION_VAR
+    return Q
+
+# ===== MÁXIMOS EN VENTANA SOBRE EL HISTORIAL =====
+
+def _push_window_max(window: Deque[Tuple[int, float]], index: int, value: float, size: int):
+    """Agregar (index, value) a una cola monótona cuyo primer elemento es el máximo
+    de las últimas `size` muestras"""
+    while window and window[-1][1] <= value:
+        window.pop()
+    window.append((index, value))
+    while window[0][0] <= index - size:
+        window.popleft()
+
+# ===== ASOCIACIÓN PISTAS-DETECCIONES =====
+
+ASSOCIATION_GATE_COST = 1e9  # Coste de los pares fuera de la puerta de distancia
+ASSOCIATION_MAX_DISTANCE = 0.1  # Máximo 10% del frame entre pista y detección
+ASSOCIATION_SIZE_WEIGHT = 0.1  # Peso de la diferencia de ancho + alto en el coste
+
+@njit(cache=True, fastmath=True)
+def _kernel_association_cost(tracks, dets, out):
+    """Escribir en out[:n, :m] el coste de cada par (pista, detección): distancia al
+    cuadrado más el cuadrado de la diferencia de tamaño ponderada, sin raíces"""
+    max_dist_sq = ASSOCIATION_MAX_DISTANCE * ASSOCIATION_MAX_DISTANCE
+    for i in range(tracks.shape[0]):
+        for j in range(dets.shape[0]):
+            dx = tracks[i, 0] - dets[j, 0]
+            dy = tracks[i, 1] - dets[j, 1]
+            dist_sq = dx * dx + dy * dy
+            if dist_sq >= max_dist_sq:
+                out[i, j] = ASSOCIATION_GATE_COST
+            else:
+                size_diff = ASSOCIATION_SIZE_WEIGHT * (
+                    abs(tracks[i, 2] - dets[j, 2]) + abs(tracks[i, 3] - dets[j, 3]))
+                out[i, j] = dist_sq + size_diff * size_diff
+
+def _greedy_assignment(cost: np.ndarray) -> Tuple[List[int], List[int]]:
+    """Asignación voraz: cada pista, en orden, toma la detección libre de menor coste"""
+    cost = cost.copy()
+    rows, cols = [], []
+    for row in range(cost.shape[0]):
+        col = int(np.argmin(cost[row]))
+        if cost[row, col] < ASSOCIATION_GATE_COST:
+            cost[:, col] = ASSOCIATION_GATE_COST
+            rows.append(row)
+            cols.append(col)
+    return rows, cols
+
+def _assign(cost: np.ndarray) -> Tuple[List[int], List[int]]:
+    """Pares (pista, detección) de coste mínimo global, descartando los fuera de la puerta"""
+    # Solo las detecciones dentro de la puerta de alguna pista entran en la asignación
+    candidates = np.flatnonzero((cost < ASSOCIATION_GATE_COST).any(axis=0))
+    if not len(candidates):
+        return [], []
+    cost = cost[:, candidates]
+    if linear_sum_assignment is None:
+        rows, cols = _greedy_assignment(cost)
+        return rows, candidates[cols].tolist()
+    rows, cols = linear_sum_assignment(cost)
+    keep = cost[rows, cols] < ASSOCIATION_GATE_COST
+    return rows[keep].tolist(), candidates[cols[keep]].tolist()
+
+# ===== KERNEL DE CONTROL PTZ =====
+
+PTZ_GAIN = 2.0                  # Ganancia proporcional del error respecto al centro
+PTZ_ADAPTIVE_MIN_DISTANCE = 0.1  # Distancia al centro a partir de la cual se acelera
+PTZ_ADAPTIVE_MIN_DISTANCE_SQ = PTZ_ADAPTIVE_MIN_DISTANCE * PTZ_ADAPTIVE_MIN_DISTANCE
+
+@njit(cache=True, fastmath=True)
+def _kernel_ptz_movement(cx, cy, max_pan, max_tilt, adaptive):
+    """Velocidades (pan, tilt) para centrar el punto (cx, cy) en el frame"""
+    # Calcular error respecto al centro del frame
+    error_x = cx - 0.5
+    error_y = cy - 0.5
+    
+    # Distancia al centro al cuadrado; la raíz solo se calcula si se usa
+    distance_sq = error_x * error_x + error_y * error_y
+    
+    # Velocidades base (Y invertida para tilt)
+    pan_speed = error_x * PTZ_GAIN
+    tilt_speed = -error_y * PTZ_GAIN
+    
+    # Limitar al máximo configurado con selects que LLVM reduce a minss/maxss
+    pan_speed = max_pan if pan_speed > max_pan else (-max_pan if pan_speed < -max_pan else pan_speed)
+    tilt_speed = max_tilt if tilt_speed > max_tilt else (-max_tilt if tilt_speed < -max_tilt else tilt_speed)
+    
+    # Moverse más rápido si el objeto está lejos del centro
+    if adaptive and distance_sq > PTZ_ADAPTIVE_MIN_DISTANCE_SQ:
+        speed_multiplier = 1.0 + math.sqrt(distance_sq)
+        pan_speed *= speed_multiplier
+        tilt_speed *= speed_multiplier
+    
+    return pan_speed, tilt_speed
+
+@dataclass(slots=True)
 class TrackedObject:
     """Representa un objeto siendo rastreado con historial completo"""
     id: int
-    positions: List[ObjectPosition] = field(default_factory=list)
+    positions: Deque[ObjectPosition] = field(default_factory=lambda: deque(maxlen=MAX_POSITION_HISTORY))
     last_seen: float = 0.0
-    confidence_history: List[float] = field(default_factory=list)
+    average_confidence: float = 0.0
     priority_score: float = 0.0
     
     # Análisis de movimiento
@@ -189,86 +362,163 @@ class TrackedObject:
     last_targeted_time: float = 0.0
     total_tracking_time: float = 0.0
     
+    # Fila asignada en los buffers SoA del tracker (-1 = sin asignar)
+    slot: int = -1
+    
+    # Filtro de Kalman: media [cx, cy, vx, vy], covarianza 4x4 e instante del estado
+    kf_mean: np.ndarray = field(default_factory=lambda: np.zeros(4, dtype=np.float32),
+                                repr=False, compare=False)
+    kf_cov: np.ndarray = field(default_factory=lambda: np.eye(4, dtype=np.float32),
+                               repr=False, compare=False)
+    kf_time: float = 0.0
+    kf_innovation_sq: float = math.inf  # |medida - predicción|^2 de la última corrección
+    
+    # Historial numérico SoA [cx, cy, w, h, conf, ts relativo a first_seen]
+    ring: np.ndarray = field(
+        default_factory=lambda: np.zeros((MAX_POSITION_HISTORY, 6), dtype=np.float32),
+        repr=False, compare=False)
+    ring_head: int = 0   # Próxima fila a escribir
+    ring_count: int = 0  # Filas válidas
+    
+    # Marcado en add_position; indica que la prioridad debe recalcularse
+    _dirty: bool = field(default=False, init=False, repr=False, compare=False)
+    
+    # Sumas acumuladas de confianza, área, área^2 y ratio de forma presentes en el buffer circular
+    _conf_sum: float = field(default=0.0, init=False, repr=False, compare=False)
+    _area_sum: float = field(default=0.0, init=False, repr=False, compare=False)
+    _area_sqsum: float = field(default=0.0, init=False, repr=False, compare=False)
+    _ratio_sum: float = field(default=0.0, init=False, repr=False, compare=False)
+    
     def __post_init__(self):
         if self.first_seen == 0.0:
             self.first_seen = time.time()
     
-    def add_position(self, position: ObjectPosition):
-        """Agregar nueva posición y actualizar análisis"""
-        current_time = time.time()
+    def add_position(self, position: ObjectPosition, current_time: Optional[float] = None):
+        """Agregar nueva posición y actualizar análisis.
+        
+        Sin current_time se usa la marca de tiempo de la propia posición, de modo que
+        todas las detecciones de un mismo frame comparten un único instante.
+        """
+        if current_time is None:
+            current_time = position.timestamp
         
-        # Agregar posición
+        # Actualizar filtro de Kalman con la nueva medida
+        if not self.positions:
+            self._kf_initialize(position)
+        else:
+            dt = position.timestamp - self.kf_time
+            if dt > 0:
+                self._kf_predict(dt)
+            self._kf_update(position.cx, position.cy)
+        self.kf_time = max(self.kf_time, position.timestamp)
+        
+        # Agregar posición (los deque acotados descartan solos la más antigua)
         self.positions.append(position)
-        self.confidence_history.append(position.confidence)
+        row = self.ring[self.ring_head]
+        if self.ring_count == MAX_POSITION_HISTORY:
+            self._accumulate_row(row, -1.0)  # Fila que sale del historial
+        row[:] = (position.cx, position.cy, position.width, position.height,
+                  position.confidence, position.timestamp - self.first_seen)
+        self.ring_head = (self.ring_head + 1) % MAX_POSITION_HISTORY
+        self.ring_count = min(self.ring_count + 1, MAX_POSITION_HISTORY)
+        
+        # Media móvil de confianza en O(1)
+        self._accumulate_row(row, 1.0)
+        self.average_confidence = self._conf_sum / self.ring_count
         self.last_seen = current_time
         self.frames_tracked += 1
-        
-        # Mantener historial limitado
-        max_history = 20
-        if len(self.positions) > max_history:
-            self.positions = self.positions[-max_history:]
-            self.confidence_history = self.confidence_history[-max_history:]
+        self._dirty = True
         
         # Actualizar análisis
         self._update_movement_analysis()
         self._update_size_analysis()
-        self._update_tracking_stats()
+        self._update_tracking_stats(current_time)
+    
+    def _accumulate_row(self, row: np.ndarray, sign: float):
+        """Sumar (sign=1) o restar (sign=-1) una fila del historial a las sumas acumuladas"""
+        _, _, w, h, conf, _ = row.tolist()
+        area = w * h
+        self._conf_sum += sign * conf
+        self._area_sum += sign * area
+        self._area_sqsum += sign * area * area
+        # Las alturas nulas cuentan como ratio 1.0
+        self._ratio_sum += sign * (w / h if h > 0 else 1.0)
+    
+    def detach_slot(self):
+        """Sustituir las vistas del slot por copias propias al liberarlo.
+        
+        Quien conserve el objeto (callbacks, hilo de seguimiento) sigue viendo su último
+        estado y no el de la siguiente pista que ocupe el slot.
+        """
+        self.kf_mean = self.kf_mean.copy()
+        self.kf_cov = self.kf_cov.copy()
+        self.ring = self.ring.copy()
+        self.slot = -1
+    
+    def _kf_initialize(self, position: ObjectPosition):
+        """Inicializar el estado del filtro con la primera detección"""
+        self.kf_mean[:] = (position.cx, position.cy, 0.0, 0.0)
+        self.kf_cov[:] = np.diag([KF_MEASUREMENT_VAR, KF_MEASUREMENT_VAR,
+                                  KF_INITIAL_VELOCITY_VAR, KF_INITIAL_VELOCITY_VAR])
+        self.kf_innovation_sq = math.inf
+    
+    def _kf_predict(self, dt: float):
+        """Avanzar el estado del filtro dt segundos"""
+        F = _kf_transition(dt)
+        self.kf_mean[:] = F @ self.kf_mean
+        self.kf_cov[:] = F @ self.kf_cov @ F.T + _kf_process_noise(dt)
+    
+    def _kf_update(self, cx: float, cy: float):
+        """Corregir el estado del filtro con una medida de posición"""
+        P = self.kf_cov
+        # H selecciona [cx, cy], por lo que S = P[:2,:2] + R y K = P[:, :2] S^-1
+        (s00, s01), (s10, s11) = P[:2, :2].tolist()
+        s00 += KF_MEASUREMENT_VAR
+        s11 += KF_MEASUREMENT_VAR
+        # Inversa explícita de la matriz 2x2 S
+        inv_det = 1.0 / (s00 * s11 - s01 * s10)
+        S_inv = np.array([[s11 * inv_det, -s01 * inv_det],
+                          [-s10 * inv_det, s00 * inv_det]], dtype=np.float32)
+        K = P[:, :2] @ S_inv
+        innovation = np.array([cx, cy], dtype=np.float32) - self.kf_mean[:2]
+        self.kf_innovation_sq = float(innovation @ innovation)
+        self.kf_mean += K @ innovation
+        self.kf_cov[:] = P - K @ P[:2, :]
     
     def _update_movement_analysis(self):
         """Actualizar análisis de movimiento del objeto"""
-        if len(self.positions) < 2:
-            self.is_moving = False
-            self.movement_speed = 0.0
-            return
+        # La velocidad sale directamente del estado del filtro de Kalman (una sola conversión)
+        vx, vy = self.kf_mean[2:].tolist()
+        self.velocity_x = vx
+        self.velocity_y = vy
+        speed_sq = vx * vx + vy * vy
         
-        # Calcular velocidades recientes
-        recent_positions = self.positions[-5:] if len(self.positions) >= 5 else self.positions
+        # Considerar que se mueve si velocidad > umbral (comparado al cuadrado)
+        self.is_moving = speed_sq > 1e-4  # 1% del frame por segundo
         
-        if len(recent_positions) < 2:
-            return
-        
-        # Calcular velocidad promedio
-        velocities_x = []
-        velocities_y = []
-        
-        for i in range(1, len(recent_positions)):
-            dt = recent_positions[i].timestamp - recent_positions[i-1].timestamp
-            if dt > 0:
-                vx = (recent_positions[i].cx - recent_positions[i-1].cx) / dt
-                vy = (recent_positions[i].cy - recent_positions[i-1].cy) / dt
-                velocities_x.append(vx)
-                velocities_y.append(vy)
-        
-        if velocities_x and velocities_y:
-            self.velocity_x = sum(velocities_x) / len(velocities_x)
-            self.velocity_y = sum(velocities_y) / len(velocities_y)
-            self.movement_speed = math.sqrt(self.velocity_x**2 + self.velocity_y**2)
-            self.movement_direction = math.atan2(self.velocity_y, self.velocity_x)
-            
-            # Considerar que se mueve si velocidad > umbral
-            self.is_moving = self.movement_speed > 0.01  # 1% del frame por segundo
+        self.movement_speed = math.hypot(vx, vy)
+        if self.is_moving:
+            self.movement_direction = math.atan2(vy, vx)
     
     def _update_size_analysis(self):
         """Actualizar análisis de tamaño del objeto"""
-        if not self.positions:
+        if not self.ring_count:
             return
         
-        # Calcular tamaño promedio
-        sizes = [pos.width * pos.height for pos in self.positions]
-        self.average_size = sum(sizes) / len(sizes)
+        # Media y varianza del área a partir de las sumas acumuladas, en O(1)
+        n = self.ring_count
+        average = self._area_sum / n
+        self.average_size = average
         
-        # Calcular estabilidad del tamaño (varianza)
-        if len(sizes) > 1:
-            variance = sum((s - self.average_size)**2 for s in sizes) / len(sizes)
-            self.size_stability = 1.0 / (1.0 + variance)  # 1 = muy estable, 0 = muy variable
+        # La estabilidad (1 = muy estable, 0 = muy variable) requiere al menos dos muestras
+        if n > 1:
+            variance = max(self._area_sqsum / n - average * average, 0.0)
+            self.size_stability = 1.0 / (1.0 + variance)
         
-        # Calcular ratio de forma promedio
-        ratios = [pos.width / pos.height if pos.height > 0 else 1.0 for pos in self.positions]
-        self.shape_ratio = sum(ratios) / len(ratios)
+        self.shape_ratio = self._ratio_sum / n
     
-    def _update_tracking_stats(self):
+    def _update_tracking_stats(self, current_time: float):
         """Actualizar estadísticas de seguimiento"""
-        current_time = time.time()
         self.time_being_tracked = current_time - self.first_seen
         
         if self.is_primary_target:
@@ -276,9 +526,7 @@ class TrackedObject:
     
     def get_average_confidence(self) -> float:
         """Obtener confianza promedio"""
-        if not self.confidence_history:
-            return 0.0
-        return sum(self.confidence_history) / len(self.confidence_history)
+        return self.average_confidence
     
     def get_current_position(self) -> Optional[ObjectPosition]:
         """Obtener posición más reciente"""
@@ -295,20 +543,24 @@ class TrackedObject:
         
         return object_area / frame_area if frame_area > 0 else 0.0
     
+    def get_kalman_position(self, time_ahead: float = 0.0) -> Tuple[float, float]:
+        """Posición (cx, cy) filtrada por Kalman, extrapolada time_ahead segundos"""
+        cx, cy, vx, vy = self.kf_mean.tolist()
+        return cx + vx * time_ahead, cy + vy * time_ahead
+    
     def get_predicted_position(self, time_ahead: float = 0.1) -> Optional[ObjectPosition]:
-        """Predecir posición futura basada en velocidad actual"""
+        """Predecir posición futura con el estado del filtro de Kalman"""
         current_pos = self.get_current_position()
         if not current_pos or not self.is_moving:
             return current_pos
         
-        # Predicción simple basada en velocidad
-        predicted_cx = current_pos.cx + self.velocity_x * time_ahead
-        predicted_cy = current_pos.cy + self.velocity_y * time_ahead
+        # Propagar el estado del filtro time_ahead segundos
+        predicted_state = _kf_transition(time_ahead) @ self.kf_mean
         
         # Crear nueva posición predicha
         predicted_pos = ObjectPosition(
-            cx=predicted_cx,
-            cy=predicted_cy,
+            cx=float(predicted_state[0]),
+            cy=float(predicted_state[1]),
             width=current_pos.width,
             height=current_pos.height,
             confidence=current_pos.confidence * 0.8,  # Reducir confianza por predicción
@@ -323,6 +575,153 @@ class TrackedObject:
         """Determinar si el objeto se considera perdido"""
         return (current_time - self.last_seen) > timeout
 
+# ===== ESTADO DEL TRACKER =====
+
+def _prune_missing(cache: Dict[int, Any], current: Dict[int, Any]):
+    """Eliminar de `cache` las claves que ya no están en `current`"""
+    for obj_id in [obj_id for obj_id in cache if obj_id not in current]:
+        del cache[obj_id]
+
+@dataclass(slots=True)
+class _StatusPosition:
+    """Posición actual de un objeto en el estado del tracker"""
+    cx: Optional[float] = None
+    cy: Optional[float] = None
+    width: Optional[float] = None
+    height: Optional[float] = None
+
+@dataclass(slots=True)
+class _StatusObject:
+    """Resumen de un objeto rastreado en el estado del tracker"""
+    position: _StatusPosition = field(default_factory=_StatusPosition)
+    confidence: float = 0.0
+    priority: float = 0.0
+    is_moving: bool = False
+    movement_speed: float = 0.0
+    is_primary: bool = False
+    time_tracked: float = 0.0
+    frames_tracked: int = 0
+    
+    def update_from(self, obj: 'TrackedObject'):
+        """Copiar el estado actual de un objeto rastreado"""
+        current_pos = obj.get_current_position()
+        position = self.position
+        if current_pos:
+            position.cx = current_pos.cx
+            position.cy = current_pos.cy
+            position.width = current_pos.width
+            position.height = current_pos.height
+        else:
+            position.cx = position.cy = position.width = position.height = None
+        
+        self.confidence = obj.get_average_confidence()
+        self.priority = obj.priority_score
+        self.is_moving = obj.is_moving
+        self.movement_speed = obj.movement_speed
+        self.is_primary = obj.is_primary_target
+        self.time_tracked = obj.time_being_tracked
+        self.frames_tracked = obj.frames_tracked
+    
+    def fill_dict(self, out: Dict[str, Any]) -> Dict[str, Any]:
+        """Escribir los campos en `out` (nuevo o reutilizado) y devolverlo"""
+        position = self.position
+        out_position = out.setdefault('position', {})
+        out_position['cx'] = position.cx
+        out_position['cy'] = position.cy
+        out_position['width'] = position.width
+        out_position['height'] = position.height
+        out['confidence'] = self.confidence
+        out['priority'] = self.priority
+        out['is_moving'] = self.is_moving
+        out['movement_speed'] = self.movement_speed
+        out['is_primary'] = self.is_primary
+        out['time_tracked'] = self.time_tracked
+        out['frames_tracked'] = self.frames_tracked
+        return out
+
+@dataclass(slots=True)
+class _TrackerStatus:
+    """Estado completo del tracker; se convierte a diccionario solo cuando se necesita"""
+    timestamp: float = 0.0
+    state: str = TrackingState.IDLE.value
+    tracking_active: bool = False
+    
+    # Cámara
+    ip: str = ""
+    port: int = 0
+    connected: bool = False
+    
+    # Objetivo actual
+    current_target_id: Optional[int] = None
+    is_following_primary: bool = True
+    
+    objects: Dict[int, _StatusObject] = field(default_factory=dict)
+    
+    # Zoom y movimiento
+    zoom_level: float = 0.0
+    target_zoom_level: float = 0.0
+    pan_speed: float = 0.0
+    tilt_speed: float = 0.0
+    
+    # Estadísticas
+    session_duration: float = 0.0
+    total_detections: int = 0
+    successful_tracks: int = 0
+    failed_tracks: int = 0
+    switch_count: int = 0
+    zoom_changes: int = 0
+    
+    # Configuración
+    alternating_enabled: bool = True
+    auto_zoom_enabled: bool = True
+    max_objects: int = 0
+    primary_follow_time: float = 0.0
+    secondary_follow_time: float = 0.0
+    
+    def to_dict(self, objects_info: Optional[Dict[int, Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Diccionario con el formato histórico de get_status()"""
+        if objects_info is None:
+            objects_info = {obj_id: obj.fill_dict({}) for obj_id, obj in self.objects.items()}
+        return {
+            'timestamp': self.timestamp,
+            'state': self.state,
+            'tracking_active': self.tracking_active,
+            'camera_info': {
+                'ip': self.ip,
+                'port': self.port,
+                'connected': self.connected
+            },
+            'current_target': {
+                'id': self.current_target_id,
+                'is_primary': self.is_following_primary
+            },
+            'objects': objects_info,
+            'zoom': {
+                'current_level': self.zoom_level,
+                'target_level': self.target_zoom_level
+            },
+            'movement': {
+                'pan_speed': self.pan_speed,
+                'tilt_speed': self.tilt_speed
+            },
+            'statistics': {
+                'session_duration': self.session_duration,
+                'total_detections': self.total_detections,
+                'successful_tracks': self.successful_tracks,
+                'failed_tracks': self.failed_tracks,
+                'switch_count': self.switch_count,
+                'zoom_changes': self.zoom_changes,
+                'objects_count': len(self.objects)
+            },
+            'configuration': {
+                'alternating_enabled': self.alternating_enabled,
+                'auto_zoom_enabled': self.auto_zoom_enabled,
+                'max_objects': self.max_objects,
+                'primary_follow_time': self.primary_follow_time,
+                'secondary_follow_time': self.secondary_follow_time
+            }
+        }
+
 class MultiObjectPTZTracker:
     """Tracker PTZ avanzado para seguimiento multi-objeto con zoom inteligente"""
     
@@ -335,6 +734,9 @@ class MultiObjectPTZTracker:
         self.basic_config = basic_config
         self.multi_config = multi_config or MultiObjectConfig()
         
+        # Logger (antes de inicializar la cámara, que ya registra mensajes)
+        self.logger = logging.getLogger(f'PTZTracker_{ip}')
+        
         # Validar configuración
         if not self.multi_config.validate():
             raise ValueError("Configuración multi-objeto inválida")
@@ -344,33 +746,94 @@ class MultiObjectPTZTracker:
         self.tracking_active = False
         self.tracking_thread = None
         self.stop_tracking_event = threading.Event()
+        self._new_data_event = threading.Event()  # Señalado por update_detections
+        
+        # Compilar el kernel de control PTZ antes del primer ciclo de seguimiento
+        _kernel_ptz_movement(0.5, 0.5, 1.0, 1.0, False)
         
         # Conexión PTZ
         self.camera = None
         self.ptz_service = None
         self.profile_token = None
+        self._move_req = None
+        self._zoom_req = None
+        self._stop_req = None
+        self._goto_preset_req = None
         self._initialize_camera()
         
         # Estado multi-objeto
         self.tracked_objects: Dict[int, TrackedObject] = {}
         self.next_object_id = 1
+        self._moving_count = 0  # Objetos rastreados con is_moving, mantenido al actualizarlos
         self.current_target_id: Optional[int] = None
         self.secondary_target_id: Optional[int] = None
         
+        # Buffer SoA de entradas de prioridad por slot: [avg_conf, speed, size_ratio, cx, cy]
+        max_objects = self.multi_config.max_objects_to_track
+        self._prio_buf = np.zeros((max_objects, 5), dtype=np.float32)
+        self._free_slots = list(range(max_objects - 1, -1, -1))
+        
+        # Último instante visto e ID del objeto por slot; los slots libres quedan en +inf
+        self._last_seen_arr = np.full(max_objects, np.inf)
+        self._slot_ids = np.zeros(max_objects, dtype=np.int64)
+        
+        # Estados de Kalman apilados por slot; cada TrackedObject guarda vistas a su fila
+        self._kf_mean = np.zeros((max_objects, 4), dtype=np.float32)
+        self._kf_cov = np.tile(np.eye(4, dtype=np.float32), (max_objects, 1, 1))
+        
+        # Historiales numéricos apilados por slot (objetos x historial x RING_*), también como vistas
+        self._rings = np.zeros((max_objects, MAX_POSITION_HISTORY, 6), dtype=np.float32)
+        
+        # Matriz de costes de asociación en float32 reutilizada entre frames (crece con las detecciones)
+        self._cost_buf = np.empty((max_objects, 16), dtype=np.float32)
+        _kernel_association_cost(np.zeros((1, 4), dtype=np.float32),
+                                 np.zeros((1, 4), dtype=np.float32), self._cost_buf)
+        
         # Control de alternancia
         self.last_switch_time = 0.0
         self.current_follow_start_time = 0.0
         self.is_following_primary = True
         self.switch_count = 0
+        self.reload_config()
         
         # Control de zoom
         self.current_zoom_level = 0.5
         self.target_zoom_level = 0.5
-        self.zoom_history = []
         self.zoom_change_count = 0
         
-        # Historial de movimiento PTZ
-        self.ptz_movement_history = []
+        # Historial de zoom: agregados de toda la sesión, sin guardar cada nivel
+        self._zoom_n = 0
+        self._zoom_sum = 0.0
+        self._zoom_min = math.inf
+        self._zoom_max = -math.inf
+        self._zoom_adjusting = False
+        self._last_zoom_cmd_ts = 0.0
+        
+        # Historial de movimiento PTZ (buffer circular SoA)
+        self._pan_hist = np.zeros(PTZ_HISTORY_SIZE, dtype=np.float32)
+        self._tilt_hist = np.zeros(PTZ_HISTORY_SIZE, dtype=np.float32)
+        self._ts_hist = np.zeros(PTZ_HISTORY_SIZE, dtype=np.float64)
+        self._tid_hist = np.zeros(PTZ_HISTORY_SIZE, dtype=np.int32)
+        self._hist_idx = 0
+        
+        # Agregados de la ventana del historial PTZ: sumas y colas monótonas (índice, |v|) del máximo
+        self._pan_sum = 0.0
+        self._tilt_sum = 0.0
+        self._pan_abs_max: Deque[Tuple[int, float]] = deque()
+        self._tilt_abs_max: Deque[Tuple[int, float]] = deque()
+        
+        # Agrupación de comandos ContinuousMove: último enviado y pendiente de envío
+        self._last_sent_pan = 0.0
+        self._last_sent_tilt = 0.0
+        self._last_send_ts = 0.0
+        self._pending_send: Optional[Tuple[float, float]] = None
+        
+        # Envío asíncrono de comandos ONVIF mientras el seguimiento está activo.
+        # Colas de un solo elemento: un comando nuevo reemplaza al que no se alcanzó a enviar.
+        self._ptz_queue: queue.Queue = queue.Queue(maxsize=1)
+        self._zoom_queue: queue.Queue = queue.Queue(maxsize=1)
+        self._sender_threads: List[threading.Thread] = []
+        self._soap_lock = threading.Lock()  # El cliente ONVIF se comparte entre hilos de envío
         self.current_pan_speed = 0.0
         self.current_tilt_speed = 0.0
         self.target_pan_speed = 0.0
@@ -382,6 +845,10 @@ class MultiObjectPTZTracker:
         self.successful_tracks = 0
         self.failed_tracks = 0
         
+        # Estado reutilizado por get_status_snapshot()
+        self._status = _TrackerStatus()
+        self._objects_info_cache: Dict[int, Dict[str, Any]] = {}
+        
         # Callbacks para eventos
         self.on_object_detected: Optional[Callable] = None
         self.on_object_lost: Optional[Callable] = None
@@ -389,14 +856,59 @@ class MultiObjectPTZTracker:
         self.on_zoom_changed: Optional[Callable] = None
         self.on_state_change: Optional[Callable] = None
         self.on_tracking_update: Optional[Callable] = None
-        
-        # Logger
-        self.logger = logging.getLogger(f'PTZTracker_{ip}')
+    
+    def reload_config(self):
+        """Copiar a atributos los valores de configuración leídos en el bucle de seguimiento.
+        
+        Debe llamarse después de modificar ``multi_config`` en caliente.
+        """
+        cfg = self.multi_config
+        # Pesos [confianza, movimiento, tamaño, proximidad] de las columnas de características
+        self._priority_weights = np.array([cfg.confidence_weight, cfg.movement_weight,
+                                           cfg.size_weight, cfg.proximity_weight], dtype=np.float32)
+        self._pft = cfg.primary_follow_time
+        self._sft = cfg.secondary_follow_time
+        self._max_si = cfg.max_switch_interval
+        self._min_si = cfg.min_switch_interval
+        
+        # Control PTZ
+        self._max_pan = float(cfg.max_pan_speed)
+        self._max_tilt = float(cfg.max_tilt_speed)
+        self._smooth = cfg.movement_smoothing
+        self._adaptive = bool(cfg.adaptive_zoom)
+        self._pred_enabled = cfg.prediction_enabled
+        self._pred_time = cfg.prediction_time
+        self._ptz_eps = cfg.ptz_command_epsilon
+        self._ptz_flush_s = cfg.ptz_flush_timeout_ms / 1000.0
+        self._innovation_gate_sq = cfg.ptz_innovation_gate * cfg.ptz_innovation_gate
+        
+        # Zoom automático
+        self._auto_zoom = cfg.auto_zoom_enabled
+        self._target_ratio = cfg.target_object_ratio
+        self._min_zoom = cfg.min_zoom_level
+        self._max_zoom = cfg.max_zoom_level
+        self._zoom_speed = cfg.zoom_speed
+        self._zoom_enter = cfg.zoom_hysteresis_enter
+        self._zoom_exit = cfg.zoom_hysteresis_exit
+        self._zoom_min_interval = cfg.zoom_cmd_min_interval_s
+        
+        # Variante del ciclo de seguimiento para el modo configurado
+        self._tick = self._tick_alternating if cfg.alternating_enabled else self._tick_single
+        
+        self._schedule_switch_deadline()
+    
+    def _schedule_switch_deadline(self):
+        """Recalcular el instante del próximo cambio de objetivo"""
+        follow_time = self._pft if self.is_following_primary else self._sft
+        self._next_switch_deadline = self.current_follow_start_time + follow_time
+        self._force_switch_deadline = self.last_switch_time + self._max_si
+        self._switch_deadline = min(self._next_switch_deadline, self._force_switch_deadline)
     
     def _initialize_camera(self):
         """Inicializar conexión con cámara PTZ"""
         try:
-            from onvif import ONVIFCamera
+            if ONVIFCamera is None:
+                raise ImportError("Módulo onvif no disponible")
             
             self.camera = ONVIFCamera(self.ip, self.port, self.username, self.password)
             self.media = self.camera.create_media_service()
@@ -406,14 +918,39 @@ class MultiObjectPTZTracker:
             media_profiles = self.media.GetProfiles()
             if media_profiles:
                 self.profile_token = media_profiles[0].token
-                self.logger.info(f"Cámara PTZ inicializada: {self.ip}:{self.port}")
+                self._setup_ptz_requests()
+                self.logger.info("Cámara PTZ inicializada: %s:%s", self.ip, self.port)
             else:
                 raise Exception("No se encontraron perfiles de medios")
             
         except Exception as e:
-            self.logger.error(f"Error inicializando cámara PTZ: {e}")
+            self.logger.error("Error inicializando cámara PTZ: %s", e)
             raise
     
+    def _setup_ptz_requests(self):
+        """Crear una sola vez los requests ONVIF; cada envío solo actualiza sus valores"""
+        self._move_req = self.ptz_service.create_type('ContinuousMove')
+        self._move_req.ProfileToken = self.profile_token
+        self._move_req.Velocity = {
+            'PanTilt': {'x': 0.0, 'y': 0.0},
+            'Zoom': {'x': 0.0}  # Sin zoom por ahora
+        }
+        
+        # Zoom absoluto (mantener pan/tilt actuales)
+        self._zoom_req = self.ptz_service.create_type('AbsoluteMove')
+        self._zoom_req.ProfileToken = self.profile_token
+        self._zoom_req.Position = {'Zoom': {'x': 0.0}}
+        self._zoom_req.Speed = {'Zoom': {'x': 0.0}}
+        
+        self._stop_req = self.ptz_service.create_type('Stop')
+        self._stop_req.ProfileToken = self.profile_token
+        self._stop_req.PanTilt = True
+        self._stop_req.Zoom = True
+        
+        # Ir a preset: solo cambia PresetToken entre envíos
+        self._goto_preset_req = self.ptz_service.create_type('GotoPreset')
+        self._goto_preset_req.ProfileToken = self.profile_token
+    
     def start_tracking(self) -> bool:
         """Iniciar el seguimiento multi-objeto"""
         if self.tracking_active:
@@ -425,6 +962,9 @@ class MultiObjectPTZTracker:
             self.tracking_active = True
             self.state = TrackingState.TRACKING
             
+            # Hilos de envío de comandos PTZ y zoom
+            self._start_command_senders()
+            
             # Iniciar hilo de seguimiento
             self.tracking_thread = threading.Thread(target=self._tracking_loop, daemon=True)
             self.tracking_thread.start()
@@ -437,7 +977,7 @@ class MultiObjectPTZTracker:
             return True
         
         except Exception as e:
-            self.logger.error(f"Error iniciando seguimiento: {e}")
+            self.logger.error("Error iniciando seguimiento: %s", e)
             self.tracking_active = False
             self.state = TrackingState.ERROR
             return False
@@ -448,10 +988,12 @@ class MultiObjectPTZTracker:
             return
         
         self.stop_tracking_event.set()
+        self._new_data_event.set()  # Despertar el bucle para que termine ya
         self.tracking_active = False
         
         if self.tracking_thread and self.tracking_thread.is_alive():
             self.tracking_thread.join(timeout=2.0)
+        self._stop_command_senders()
         
         # Resetear estado
         self.state = TrackingState.IDLE
@@ -463,89 +1005,176 @@ class MultiObjectPTZTracker:
         if self.on_state_change:
             self.on_state_change(self.state)
     
+    def _start_command_senders(self):
+        """Iniciar un hilo por cola de comandos para no bloquear el bucle en la llamada SOAP"""
+        self._sender_threads = [
+            threading.Thread(target=self._command_sender_loop, args=(command_queue,), daemon=True)
+            for command_queue in (self._ptz_queue, self._zoom_queue)
+        ]
+        for thread in self._sender_threads:
+            thread.start()
+    
+    def _stop_command_senders(self):
+        """Detener los hilos de envío; los comandos pendientes se descartan"""
+        for command_queue in (self._ptz_queue, self._zoom_queue):
+            self._offer_command(command_queue, None)
+        for thread in self._sender_threads:
+            thread.join(timeout=2.0)
+        self._sender_threads = []
+    
+    @staticmethod
+    def _offer_command(command_queue: queue.Queue, command):
+        """Encolar un comando reemplazando el pendiente (gana el más reciente)"""
+        while True:
+            try:
+                command_queue.put_nowait(command)
+                return
+            except queue.Full:
+                try:
+                    command_queue.get_nowait()
+                except queue.Empty:
+                    pass
+    
+    @staticmethod
+    def _command_sender_loop(command_queue: queue.Queue):
+        """Ejecutar los comandos (send, args) de la cola hasta recibir None"""
+        while True:
+            command = command_queue.get()
+            if command is None:
+                break
+            send, args = command
+            send(*args)
+    
     def update_detections(self, detections: List[Dict]) -> bool:
         """Actualizar con nuevas detecciones"""
         try:
             current_time = time.time()
             self.total_detections_processed += len(detections)
             
-            # Convertir detecciones a ObjectPosition
+            # Filtrar por confianza y tamaño en una sola pasada vectorizada
             new_positions = []
-            for det in detections:
-                if det.get('confidence', 0) < self.multi_config.min_confidence_threshold:
-                    continue
-                
-                pos = ObjectPosition(
-                    cx=det['cx'],
-                    cy=det['cy'],
-                    width=det['width'],
-                    height=det['height'],
-                    confidence=det['confidence'],
-                    timestamp=current_time,
-                    frame_w=det.get('frame_w', 1920),
-                    frame_h=det.get('frame_h', 1080),
-                    object_class=det.get('class', 'unknown')
-                )
+            if detections:
+                # Campos numéricos en una sola lista por comprensión: [cx, cy, width, height, conf]
+                values = np.array([(det['cx'], det['cy'], det['width'], det['height'],
+                                    det.get('confidence', 0)) for det in detections],
+                                  dtype=np.float64)
+                accepted = np.flatnonzero(
+                    self._detection_mask(values[:, 4], values[:, 2], values[:, 3]))
                 
-                # Filtrar por tamaño
-                size_ratio = pos.width * pos.height
-                if (size_ratio < self.multi_config.min_object_size or 
-                    size_ratio > self.multi_config.max_object_size):
-                    continue
-                
-                new_positions.append(pos)
+                # Convertir a ObjectPosition solo las detecciones aceptadas
+                for idx, (cx, cy, width, height, confidence) in zip(accepted.tolist(),
+                                                                    values[accepted].tolist()):
+                    det = detections[idx]
+                    new_positions.append(ObjectPosition(
+                        cx=cx,
+                        cy=cy,
+                        width=width,
+                        height=height,
+                        confidence=confidence,
+                        timestamp=current_time,
+                        frame_w=det.get('frame_w', 1920),
+                        frame_h=det.get('frame_h', 1080),
+                        object_class=det.get('class', 'unknown')
+                    ))
             
-            # Actualizar objetos rastreados
-            self._update_tracked_objects(new_positions)
+            self._process_positions(new_positions, current_time)
+            return True
+        
+        except Exception as e:
+            self.logger.error("Error actualizando detecciones: %s", e)
+            return False
+    
+    def ingest_detections(self, detections: np.ndarray, frame_w: int = 1920,
+                          frame_h: int = 1080) -> bool:
+        """Actualizar con detecciones en un array (N, 5) [cx, cy, width, height, confidence]"""
+        try:
+            current_time = time.time()
+            values = np.asarray(detections, dtype=np.float64).reshape(-1, 5)
+            self.total_detections_processed += len(values)
             
-            # Manejar pérdida de objetos
-            self._handle_lost_objects(current_time)
+            accepted = values[self._detection_mask(values[:, 4], values[:, 2], values[:, 3])]
+            new_positions = [
+                ObjectPosition(cx=cx, cy=cy, width=width, height=height, confidence=confidence,
+                               timestamp=current_time, frame_w=frame_w, frame_h=frame_h)
+                for cx, cy, width, height, confidence in accepted.tolist()
+            ]
             
+            self._process_positions(new_positions, current_time)
             return True
         
         except Exception as e:
-            self.logger.error(f"Error actualizando detecciones: {e}")
+            self.logger.error("Error actualizando detecciones: %s", e)
             return False
     
-    def _update_tracked_objects(self, new_positions: List[ObjectPosition]):
-        """Actualizar objetos siendo rastreados"""
-        current_time = time.time()
+    def _detection_mask(self, confidence: np.ndarray, width: np.ndarray,
+                        height: np.ndarray) -> np.ndarray:
+        """Máscara de detecciones con confianza y tamaño dentro de los umbrales"""
+        size_ratio = width * height
+        return ((confidence >= self.multi_config.min_confidence_threshold) &
+                (size_ratio >= self.multi_config.min_object_size) &
+                (size_ratio <= self.multi_config.max_object_size))
+    
+    def _process_positions(self, new_positions: List[ObjectPosition], current_time: float):
+        """Asociar las posiciones aceptadas a las pistas y depurar las perdidas"""
+        # Avanzar en bloque el filtro de Kalman de todas las pistas
+        self._predict_tracks(current_time)
         
-        # Asociar nuevas posiciones con objetos existentes
-        unmatched_positions = new_positions.copy()
+        # Actualizar objetos rastreados
+        self._update_tracked_objects(new_positions, current_time)
+        self._new_data_event.set()
         
-        for obj_id, tracked_obj in list(self.tracked_objects.items()):
-            best_match = None
-            best_distance = float('inf')
-            
-            current_pos = tracked_obj.get_current_position()
-            if not current_pos:
-                continue
-            
-            # Buscar la posición más cercana
-            for pos in unmatched_positions:
-                distance = math.sqrt(
-                    (pos.cx - current_pos.cx)**2 + 
-                    (pos.cy - current_pos.cy)**2
-                )
-                
-                if distance < best_distance and distance < 0.1:  # Máximo 10% del frame
-                    best_distance = distance
-                    best_match = pos
+        # Manejar pérdida de objetos
+        self._handle_lost_objects(current_time)
+    
+    def _update_tracked_objects(self, new_positions: List[ObjectPosition], current_time: float):
+        """Actualizar objetos siendo rastreados"""
+        # Asociar nuevas posiciones con objetos existentes
+        taken = np.zeros(len(new_positions), dtype=bool)
+        
+        tracks = []
+        if new_positions:
+            tracks = [(obj_id, obj) for obj_id, obj in self.tracked_objects.items() if obj.positions]
+        if tracks:
+            # Matriz de costes pistas x detecciones: distancia^2 + diferencia de tamaño^2.
+            # La última fila escrita de cada historial se lee del bloque SoA de una vez
+            slots = np.fromiter((obj.slot for _, obj in tracks), dtype=np.intp, count=len(tracks))
+            heads = np.fromiter((obj.ring_head for _, obj in tracks), dtype=np.intp, count=len(tracks))
+            T = self._rings[slots, heads - 1, RING_CX:RING_H + 1]
+            D = np.array([(pos.cx, pos.cy, pos.width, pos.height) for pos in new_positions],
+                         dtype=np.float32)
+            if self._cost_buf.shape[1] < len(D):
+                self._cost_buf = np.empty((len(self._cost_buf), 2 * len(D)), dtype=np.float32)
+            _kernel_association_cost(T, D, self._cost_buf)
+            rows, cols = _assign(self._cost_buf[:len(T), :len(D)])
+        else:
+            rows = cols = ()
+        
+        for row, col in zip(rows, cols):
+            obj_id, tracked_obj = tracks[row]
+            taken[col] = True
+            was_moving = tracked_obj.is_moving
+            tracked_obj.add_position(new_positions[col], current_time)
+            self._moving_count += tracked_obj.is_moving - was_moving
+            self._stamp_priority_inputs(tracked_obj)
+            self._last_seen_arr[tracked_obj.slot] = tracked_obj.last_seen
             
-            # Actualizar objeto si hay coincidencia
-            if best_match:
-                tracked_obj.add_position(best_match)
-                unmatched_positions.remove(best_match)
-                
-                if self.on_tracking_update:
-                    self.on_tracking_update(obj_id, tracked_obj)
+            if self.on_tracking_update:
+                self.on_tracking_update(obj_id, tracked_obj)
         
         # Crear nuevos objetos para posiciones no asociadas
-        for pos in unmatched_positions:
-            if len(self.tracked_objects) < self.multi_config.max_objects_to_track:
-                new_obj = TrackedObject(id=self.next_object_id)
-                new_obj.add_position(pos)
+        for col in np.flatnonzero(~taken):
+            pos = new_positions[col]
+            if (len(self.tracked_objects) < self.multi_config.max_objects_to_track
+                    and self._free_slots):
+                slot = self._free_slots.pop()
+                new_obj = TrackedObject(id=self.next_object_id, slot=slot, first_seen=current_time,
+                                        kf_mean=self._kf_mean[slot], kf_cov=self._kf_cov[slot],
+                                        ring=self._rings[slot])
+                new_obj.add_position(pos, current_time)
+                self._moving_count += new_obj.is_moving
+                self._stamp_priority_inputs(new_obj)
+                self._last_seen_arr[slot] = new_obj.last_seen
+                self._slot_ids[slot] = self.next_object_id
                 self.tracked_objects[self.next_object_id] = new_obj
                 
                 if self.on_object_detected:
@@ -553,16 +1182,48 @@ class MultiObjectPTZTracker:
                 
                 self.next_object_id += 1
     
+    def _predict_tracks(self, current_time: float):
+        """Ejecutar el paso de predicción de Kalman de todas las pistas en bloque"""
+        objects = [obj for obj in self.tracked_objects.values() if obj.kf_time < current_time]
+        if not objects:
+            return
+        
+        slots = np.fromiter((obj.slot for obj in objects), dtype=np.intp, count=len(objects))
+        dt = np.fromiter((current_time - obj.kf_time for obj in objects),
+                         dtype=np.float32, count=len(objects))
+        F = _kf_transition(dt)
+        
+        # mean = F @ mean ; cov = F @ cov @ F.T + Q, para todas las filas a la vez
+        self._kf_mean[slots] = np.einsum('nij,nj->ni', F, self._kf_mean[slots])
+        self._kf_cov[slots] = (np.einsum('nij,njk,nlk->nil', F, self._kf_cov[slots], F) +
+                               _kf_process_noise(dt))
+        
+        for obj in objects:
+            obj.kf_time = current_time
+    
+    def _stamp_priority_inputs(self, obj: TrackedObject):
+        """Volcar las entradas de prioridad del objeto en su fila del buffer SoA"""
+        current_pos = obj.get_current_position()
+        self._prio_buf[obj.slot] = (
+            obj.get_average_confidence(),
+            obj.movement_speed if obj.is_moving else 0.0,
+            obj.get_object_size_ratio(),
+            current_pos.cx,
+            current_pos.cy
+        )
+    
     def _handle_lost_objects(self, current_time: float):
         """Manejar objetos perdidos"""
-        lost_objects = []
-        
-        for obj_id, tracked_obj in list(self.tracked_objects.items()):
-            if tracked_obj.is_lost(current_time, self.multi_config.object_lifetime):
-                lost_objects.append(obj_id)
-        
-        for obj_id in lost_objects:
-            del self.tracked_objects[obj_id]
+        # Una sola comparación sobre los slots; los libres (+inf) nunca se marcan como perdidos
+        lost_slots = np.flatnonzero(
+            (current_time - self._last_seen_arr) > self.multi_config.object_lifetime)
+        
+        for obj_id in self._slot_ids[lost_slots].tolist():
+            lost_obj = self.tracked_objects.pop(obj_id)
+            self._moving_count -= lost_obj.is_moving
+            self._last_seen_arr[lost_obj.slot] = np.inf
+            self._free_slots.append(lost_obj.slot)
+            lost_obj.detach_slot()
             
             if self.on_object_lost:
                 self.on_object_lost(obj_id)
@@ -570,37 +1231,69 @@ class MultiObjectPTZTracker:
             # Si se perdió el objetivo actual, cambiar
             if obj_id == self.current_target_id:
                 self.current_target_id = None
-                self._select_new_target()
+                self._select_new_target(current_time)
+                
+                # Sin objetivo, no dejar la cámara girando con la última velocidad
+                if self.current_target_id is None:
+                    self._stop_movement()
     
     def _tracking_loop(self):
         """Bucle principal de seguimiento"""
         while not self.stop_tracking_event.is_set() and self.tracking_active:
             try:
-                current_time = time.time()
+                # Esperar nuevas detecciones, como máximo un ciclo (~30 FPS)
+                # o hasta el próximo cambio de objetivo programado
+                timeout = 0.033
+                if self.multi_config.alternating_enabled and self.current_target_id:
+                    remaining = self._switch_deadline - time.time()
+                    if 0.0 < remaining < timeout:
+                        timeout = remaining
+                self._new_data_event.wait(timeout=timeout)
+                self._new_data_event.clear()
+                if self.stop_tracking_event.is_set():
+                    break
                 
-                # Verificar si necesita cambiar de objetivo
-                self._check_target_switching(current_time)
+                current_time = time.time()
                 
-                # Calcular prioridades
+                # Calcular prioridades (solo de los objetos que cambiaron)
                 self._update_object_priorities()
                 
-                # Ejecutar seguimiento del objetivo actual
-                if self.current_target_id and self.current_target_id in self.tracked_objects:
-                    self._execute_tracking()
-                
-                # Control de zoom automático
-                if self.multi_config.auto_zoom_enabled:
-                    self._update_auto_zoom()
-                
-                # Dormir un poco para no sobrecargar
-                time.sleep(0.033)  # ~30 FPS
+                # Selección de objetivo, comandos PTZ y zoom según el modo configurado
+                self._tick(current_time)
                 
             except Exception as e:
-                self.logger.error(f"Error en bucle de seguimiento: {e}")
+                self.logger.error("Error en bucle de seguimiento: %s", e)
                 time.sleep(0.1)
         
         self.logger.info("Bucle de seguimiento terminado")
     
+    def _tick_alternating(self, current_time: float):
+        """Ciclo de seguimiento alternando entre objetivo principal y secundario"""
+        # Verificar si necesita cambiar de objetivo
+        self._check_target_switching(current_time)
+        
+        # Ejecutar seguimiento del objetivo actual
+        if self.current_target_id and self.current_target_id in self.tracked_objects:
+            self._execute_tracking(current_time)
+        
+        # Enviar el comando PTZ acumulado si venció su espera
+        self._flush_ptz_command(current_time)
+        
+        # Control de zoom automático
+        if self._auto_zoom:
+            self._update_auto_zoom(current_time)
+    
+    def _tick_single(self, current_time: float):
+        """Ciclo de seguimiento sin alternancia: se mantiene en el objeto de mayor prioridad"""
+        if self.current_target_id not in self.tracked_objects:
+            self._select_new_target(current_time)
+        
+        self._execute_tracking(current_time)
+        self._flush_ptz_command(current_time)
+        
+        if self._auto_zoom:
+            self._update_auto_zoom(current_time)
+    
     def _check_target_switching(self, current_time: float):
         """Verificar si necesita cambiar de objetivo"""
         if not self.multi_config.alternating_enabled:
@@ -608,38 +1301,28 @@ class MultiObjectPTZTracker:
         
         # Si no hay objetivo principal, seleccionar uno
         if not self.current_target_id:
-            self._select_new_target()
+            self._select_new_target(current_time)
             return
         
-        # Verificar tiempo de seguimiento
-        follow_time = current_time - self.current_follow_start_time
-        
-        if self.is_following_primary:
-            max_time = self.multi_config.primary_follow_time
-        else:
-            max_time = self.multi_config.secondary_follow_time
-        
-        # Cambiar si se excedió el tiempo o se fuerza el cambio
-        if (follow_time >= max_time or 
-            (current_time - self.last_switch_time) >= self.multi_config.max_switch_interval):
-            
-            self._switch_target()
+        # Cambiar si se excedió el tiempo de seguimiento o se fuerza el cambio
+        if current_time >= self._switch_deadline:
+            self._switch_target(current_time)
     
-    def _select_new_target(self):
+    def _select_new_target(self, current_time: float):
         """Seleccionar nuevo objetivo principal"""
         if not self.tracked_objects:
             self.current_target_id = None
             return
         
         # Obtener objeto con mayor prioridad
-        best_obj_id = max(self.tracked_objects.keys(), 
-                         key=lambda oid: self.tracked_objects[oid].priority_score)
+        best_obj_id = self._top_priority_objects(1)[0][0]
         
         if best_obj_id != self.current_target_id:
             old_target = self.current_target_id
             self.current_target_id = best_obj_id
-            self.current_follow_start_time = time.time()
+            self.current_follow_start_time = current_time
             self.is_following_primary = True
+            self._schedule_switch_deadline()
             
             # Marcar como objetivo principal
             for obj_id, obj in self.tracked_objects.items():
@@ -648,21 +1331,22 @@ class MultiObjectPTZTracker:
             if self.on_target_switched:
                 self.on_target_switched(old_target, self.current_target_id)
     
-    def _switch_target(self):
+    def _top_priority_objects(self, count: int) -> List[Tuple[int, TrackedObject]]:
+        """Obtener los `count` objetos de mayor prioridad, de mayor a menor"""
+        return heapq.nlargest(count, self.tracked_objects.items(),
+                              key=lambda item: item[1].priority_score)
+    
+    def _switch_target(self, current_time: float):
         """Cambiar entre objetivos principal y secundario"""
-        current_time = time.time()
-        
         # Verificar tiempo mínimo entre cambios
-        if (current_time - self.last_switch_time) < self.multi_config.min_switch_interval:
+        if (current_time - self.last_switch_time) < self._min_si:
             return
         
         if self.is_following_primary:
             # Cambiar a secundario
             if len(self.tracked_objects) > 1:
                 # Buscar segundo mejor objeto
-                sorted_objects = sorted(self.tracked_objects.items(), 
-                                      key=lambda item: item[1].priority_score, 
-                                      reverse=True)
+                sorted_objects = self._top_priority_objects(2)
                 
                 if len(sorted_objects) >= 2:
                     old_target = self.current_target_id
@@ -670,7 +1354,7 @@ class MultiObjectPTZTracker:
                     self.secondary_target_id = sorted_objects[0][0]
                     self.is_following_primary = False
                     
-                    self._update_target_flags()
+                    self._update_target_flags(current_time)
                     
                     if self.on_target_switched:
                         self.on_target_switched(old_target, self.current_target_id)
@@ -682,7 +1366,7 @@ class MultiObjectPTZTracker:
                 self.secondary_target_id = None
                 self.is_following_primary = True
                 
-                self._update_target_flags()
+                self._update_target_flags(current_time)
                 
                 if self.on_target_switched:
                     self.on_target_switched(old_target, self.current_target_id)
@@ -690,155 +1374,221 @@ class MultiObjectPTZTracker:
         self.last_switch_time = current_time
         self.current_follow_start_time = current_time
         self.switch_count += 1
+        self._schedule_switch_deadline()
     
-    def _update_target_flags(self):
+    def _update_target_flags(self, current_time: float):
         """Actualizar flags de objetivos en objetos rastreados"""
         for obj_id, obj in self.tracked_objects.items():
             obj.is_primary_target = (obj_id == self.current_target_id)
             if obj.is_primary_target:
-                obj.last_targeted_time = time.time()
+                obj.last_targeted_time = current_time
     
     def _update_object_priorities(self):
-        """Actualizar prioridades de todos los objetos"""
-        current_time = time.time()
+        """Actualizar prioridades de los objetos con detecciones nuevas"""
+        # Solo cambian los objetos que recibieron una posición desde el último cálculo
+        dirty_objects = [obj for obj in self.tracked_objects.values() if obj._dirty]
+        if not dirty_objects:
+            return
         
-        for obj in self.tracked_objects.values():
-            # Componentes de prioridad
-            confidence_score = obj.get_average_confidence()
-            
-            movement_score = min(obj.movement_speed * 10, 1.0) if obj.is_moving else 0.0
-            
-            size_score = min(obj.get_object_size_ratio() * 4, 1.0)
-            
-            current_pos = obj.get_current_position()
-            proximity_score = 1.0 - current_pos.distance_to_center() if current_pos else 0.0
-            
-            # Calcular prioridad total
-            priority = (
-                confidence_score * self.multi_config.confidence_weight +
-                movement_score * self.multi_config.movement_weight +
-                size_score * self.multi_config.size_weight +
-                proximity_score * self.multi_config.proximity_weight
-            )
-            
+        # Componentes de prioridad calculados en bloque sobre las filas SoA afectadas
+        slots = np.fromiter((obj.slot for obj in dirty_objects), dtype=np.intp,
+                            count=len(dirty_objects))
+        b = self._prio_buf[slots]
+        features = np.empty((len(slots), 4), dtype=np.float32)
+        features[:, 0] = b[:, 0]
+        features[:, 1] = np.minimum(b[:, 1] * 10, 1.0)
+        features[:, 2] = np.minimum(b[:, 2] * 4, 1.0)
+        features[:, 3] = 1.0 - np.hypot(b[:, 3] - 0.5, b[:, 4] - 0.5)
+        
+        # Calcular prioridad total como un único producto matriz-vector
+        priorities = features @ self._priority_weights
+        
+        for obj, priority in zip(dirty_objects, priorities.tolist()):
             # Bonus por tiempo de seguimiento
             tracking_bonus = min(obj.time_being_tracked / 10.0, 0.2)
-            priority += tracking_bonus
-            
-            obj.priority_score = priority
+            obj.priority_score = priority + tracking_bonus
+            obj._dirty = False
     
-    def _execute_tracking(self):
+    def _execute_tracking(self, current_time: float):
         """Ejecutar seguimiento del objetivo actual"""
+        target_obj = self.tracked_objects.get(self.current_target_id)
+        if target_obj is None:
+            return
+        
         try:
-            if not self.current_target_id or self.current_target_id not in self.tracked_objects:
-                return
-            
-            target_obj = self.tracked_objects[self.current_target_id]
-            
-            # Obtener posición objetivo (con predicción si está habilitada)
-            if self.multi_config.prediction_enabled and target_obj.is_moving:
-                target_pos = target_obj.get_predicted_position(self.multi_config.prediction_time)
-            else:
-                target_pos = target_obj.get_current_position()
-            
-            if not target_pos:
-                return
-            
-            # Calcular comandos PTZ
-            pan_speed, tilt_speed = self._calculate_ptz_movement(target_pos)
-            
-            # Aplicar suavizado
-            self.target_pan_speed = pan_speed
-            self.target_tilt_speed = tilt_speed
-            
-            if self.multi_config.movement_smoothing > 0:
-                smoothing = self.multi_config.movement_smoothing
-                self.current_pan_speed = (self.current_pan_speed * smoothing + 
-                                        self.target_pan_speed * (1 - smoothing))
-                self.current_tilt_speed = (self.current_tilt_speed * smoothing + 
-                                         self.target_tilt_speed * (1 - smoothing))
-            else:
-                self.current_pan_speed = self.target_pan_speed
-                self.current_tilt_speed = self.target_tilt_speed
-            
-            # Enviar comando PTZ
-            self._send_ptz_command(self.current_pan_speed, self.current_tilt_speed)
-            
-            # Registrar movimiento
-            self.ptz_movement_history.append({
-                'timestamp': time.time(),
-                'pan_speed': self.current_pan_speed,
-                'tilt_speed': self.current_tilt_speed,
-                'target_id': self.current_target_id,
-                'target_pos': (target_pos.cx, target_pos.cy)
-            })
-            
-            # Limitar historial
-            if len(self.ptz_movement_history) > 100:
-                self.ptz_movement_history = self.ptz_movement_history[-50:]
-            
-            self.successful_tracks += 1
-            
-        except Exception as e:
-            self.logger.error(f"Error ejecutando seguimiento: {e}")
-            self.failed_tracks += 1
+            if self._execute_tracking_body(target_obj, current_time):
+                self.successful_tracks += 1
+        except (ArithmeticError, ValueError) as e:
+            self._on_tracking_error(e)
+    
+    def _on_tracking_error(self, error: Exception):
+        """Registrar un ciclo de seguimiento fallido"""
+        self.logger.error("Error ejecutando seguimiento: %s", error)
+        self.failed_tracks += 1
+    
+    def _execute_tracking_body(self, target_obj: TrackedObject, current_time: float) -> bool:
+        """Calcular y enviar el movimiento hacia el objetivo; False si no tiene posición"""
+        if not target_obj.positions:
+            return False
+        
+        # Posición objetivo filtrada por Kalman (extrapolada si la predicción está habilitada)
+        time_ahead = self._pred_time if (self._pred_enabled and target_obj.is_moving) else 0.0
+        cx, cy = target_obj.get_kalman_position(time_ahead)
+        
+        # Calcular comandos PTZ
+        pan_speed, tilt_speed = _kernel_ptz_movement(cx, cy, self._max_pan, self._max_tilt,
+                                                     self._adaptive)
+        
+        # Aplicar suavizado
+        self.target_pan_speed = pan_speed
+        self.target_tilt_speed = tilt_speed
+        
+        if self._smooth > 0:
+            smoothing = self._smooth
+            self.current_pan_speed = (self.current_pan_speed * smoothing + 
+                                    self.target_pan_speed * (1 - smoothing))
+            self.current_tilt_speed = (self.current_tilt_speed * smoothing + 
+                                     self.target_tilt_speed * (1 - smoothing))
+        else:
+            self.current_pan_speed = self.target_pan_speed
+            self.current_tilt_speed = self.target_tilt_speed
+        
+        # Enviar comando PTZ salvo que la última medida coincidiera con la predicción;
+        # solo los comandos enviados entran al historial
+        if (target_obj.kf_innovation_sq >= self._innovation_gate_sq and
+                self._send_ptz_command(self.current_pan_speed, self.current_tilt_speed, current_time)):
+            self._record_ptz_movement(current_time)
+        return True
+    
+    def _record_ptz_movement(self, current_time: float):
+        """Agregar el comando actual al historial PTZ y actualizar sus agregados"""
+        n = self._hist_idx
+        i = n % PTZ_HISTORY_SIZE
+        if n >= PTZ_HISTORY_SIZE:
+            # Descontar la muestra que sale de la ventana
+            self._pan_sum -= float(self._pan_hist[i])
+            self._tilt_sum -= float(self._tilt_hist[i])
+        
+        self._pan_hist[i] = self.current_pan_speed
+        self._tilt_hist[i] = self.current_tilt_speed
+        self._ts_hist[i] = current_time
+        self._tid_hist[i] = self.current_target_id
+        self._hist_idx = n + 1
+        
+        pan = float(self._pan_hist[i])
+        tilt = float(self._tilt_hist[i])
+        self._pan_sum += pan
+        self._tilt_sum += tilt
+        _push_window_max(self._pan_abs_max, n, abs(pan), PTZ_HISTORY_SIZE)
+        _push_window_max(self._tilt_abs_max, n, abs(tilt), PTZ_HISTORY_SIZE)
     
     def _calculate_ptz_movement(self, target_pos: ObjectPosition) -> Tuple[float, float]:
         """Calcular velocidades de pan y tilt necesarias"""
-        # Centro del frame como referencia
-        center_x, center_y = 0.5, 0.5
+        return _kernel_ptz_movement(float(target_pos.cx), float(target_pos.cy),
+                                    self._max_pan, self._max_tilt, self._adaptive)
+    
+    def _send_ptz_command(self, pan_speed: float, tilt_speed: float, current_time: float) -> bool:
+        """Enviar comando PTZ a la cámara; False si quedó dentro de la banda muerta"""
+        delta = max(abs(pan_speed - self._last_sent_pan), abs(tilt_speed - self._last_sent_tilt))
+        
+        # La cámara sigue ejecutando el último ContinuousMove: un cambio menor que el
+        # umbral solo se guarda y se reenvía cuando vence el tiempo de agrupación
+        if delta < self._ptz_eps and (current_time - self._last_send_ts) < self._ptz_flush_s:
+            self._pending_send = (pan_speed, tilt_speed)
+            return False
+        
+        self._pending_send = None
+        self._continuous_move(pan_speed, tilt_speed, current_time)
+        return True
+    
+    def _flush_ptz_command(self, current_time: float):
+        """Enviar el comando acumulado si ya pasó el tiempo de agrupación"""
+        if (self._pending_send is not None and
+                (current_time - self._last_send_ts) >= self._ptz_flush_s):
+            pan_speed, tilt_speed = self._pending_send
+            self._pending_send = None
+            self._continuous_move(pan_speed, tilt_speed, current_time)
+    
+    def _continuous_move(self, pan_speed: float, tilt_speed: float, current_time: float):
+        """Enviar ContinuousMove a la cámara (por el hilo de envío si el seguimiento está activo)"""
+        if self._move_req is None:
+            return
         
-        # Calcular error
-        error_x = target_pos.cx - center_x
-        error_y = target_pos.cy - center_y
+        self._last_sent_pan = pan_speed
+        self._last_sent_tilt = tilt_speed
+        self._last_send_ts = current_time
         
-        # Factor de escala basado en distancia del centro
-        distance_factor = math.sqrt(error_x**2 + error_y**2)
+        if self._sender_threads:
+            self._offer_command(self._ptz_queue, (self._soap_continuous_move, (pan_speed, tilt_speed)))
+        else:
+            self._soap_continuous_move(pan_speed, tilt_speed)
+    
+    def _stop_movement(self):
+        """Detener la cámara (por el hilo de envío, reemplazando cualquier movimiento pendiente)"""
+        if self._stop_req is None:
+            return
         
-        # Calcular velocidades base
-        pan_speed = error_x * 2.0  # Factor de ganancia
-        tilt_speed = -error_y * 2.0  # Invertir Y para tilt
+        self._pending_send = None
+        self._last_sent_pan = self._last_sent_tilt = 0.0
         
-        # Aplicar límites de velocidad
-        pan_speed = max(-self.multi_config.max_pan_speed, 
-                       min(self.multi_config.max_pan_speed, pan_speed))
-        tilt_speed = max(-self.multi_config.max_tilt_speed, 
-                        min(self.multi_config.max_tilt_speed, tilt_speed))
+        if self._sender_threads:
+            self._offer_command(self._ptz_queue, (self._soap_stop, ()))
+        else:
+            self._soap_stop()
+    
+    def goto_preset_and_track(self, preset_token, start_tracking: bool = True) -> bool:
+        """Mover la cámara a un preset y, opcionalmente, iniciar el seguimiento"""
+        if self._goto_preset_req is None:
+            return False
+        
+        # El preset reemplaza cualquier movimiento pendiente
+        self._pending_send = None
+        self._last_sent_pan = self._last_sent_tilt = 0.0
         
-        # Factor de velocidad adaptativo
-        if self.multi_config.adaptive_zoom and distance_factor > 0.1:
-            # Moverse más rápido si el objeto está lejos del centro
-            speed_multiplier = 1.0 + distance_factor
-            pan_speed *= speed_multiplier
-            tilt_speed *= speed_multiplier
+        if self._sender_threads:
+            self._offer_command(self._ptz_queue, (self._soap_goto_preset, (preset_token,)))
+        elif not self._soap_goto_preset(preset_token):
+            return False
         
-        return pan_speed, tilt_speed
+        if start_tracking and not self.tracking_active:
+            return self.start_tracking()
+        return True
     
-    def _send_ptz_command(self, pan_speed: float, tilt_speed: float):
-        """Enviar comando PTZ a la cámara"""
+    def _soap_continuous_move(self, pan_speed: float, tilt_speed: float):
+        """Llamada SOAP ContinuousMove"""
         try:
-            if not self.ptz_service or not self.profile_token:
-                return
-            
-            # Crear request de movimiento continuo
-            from onvif import ONVIFCamera
-            
-            request = self.ptz_service.create_type('ContinuousMove')
-            request.ProfileToken = self.profile_token
-            
             # Configurar velocidades
-            request.Velocity = {
-                'PanTilt': {'x': pan_speed, 'y': tilt_speed},
-                'Zoom': {'x': 0.0}  # Sin zoom por ahora
-            }
+            pan_tilt = self._move_req.Velocity['PanTilt']
+            pan_tilt['x'] = pan_speed
+            pan_tilt['y'] = tilt_speed
             
             # Enviar comando
-            self.ptz_service.ContinuousMove(request)
+            with self._soap_lock:
+                self.ptz_service.ContinuousMove(self._move_req)
             
-        except Exception as e:
-            self.logger.error(f"Error enviando comando PTZ: {e}")
+        except PTZ_COMMAND_ERRORS as e:
+            self.logger.error("Error enviando comando PTZ: %s", e)
+    
+    def _soap_stop(self):
+        """Llamada SOAP Stop de pan/tilt y zoom"""
+        try:
+            with self._soap_lock:
+                self.ptz_service.Stop(self._stop_req)
+        except PTZ_COMMAND_ERRORS as e:
+            self.logger.error("Error deteniendo PTZ: %s", e)
+    
+    def _soap_goto_preset(self, preset_token) -> bool:
+        """Llamada SOAP GotoPreset"""
+        try:
+            self._goto_preset_req.PresetToken = str(preset_token)
+            with self._soap_lock:
+                self.ptz_service.GotoPreset(self._goto_preset_req)
+            return True
+        except PTZ_COMMAND_ERRORS as e:
+            self.logger.error("Error moviendo a preset %s: %s", preset_token, e)
+            return False
     
-    def _update_auto_zoom(self):
+    def _update_auto_zoom(self, current_time: float):
         """Actualizar zoom automático basado en tamaño del objetivo"""
         try:
             if not self.current_target_id or self.current_target_id not in self.tracked_objects:
@@ -852,32 +1602,33 @@ class MultiObjectPTZTracker:
             
             # Calcular ratio actual del objeto
             object_ratio = current_pos.width * current_pos.height
-            target_ratio = self.multi_config.target_object_ratio
+            target_ratio = self._target_ratio
             
             # Calcular zoom necesario
             if object_ratio < target_ratio * 0.8:  # Objeto muy pequeño
-                self.target_zoom_level = min(self.target_zoom_level + 0.1, 
-                                           self.multi_config.max_zoom_level)
+                self.target_zoom_level = min(self.target_zoom_level + 0.1, self._max_zoom)
             elif object_ratio > target_ratio * 1.2:  # Objeto muy grande
-                self.target_zoom_level = max(self.target_zoom_level - 0.1, 
-                                           self.multi_config.min_zoom_level)
+                self.target_zoom_level = max(self.target_zoom_level - 0.1, self._min_zoom)
             
-            # Aplicar cambio gradual de zoom
+            # Aplicar cambio gradual de zoom con histéresis para no reaccionar al ruido
             zoom_diff = self.target_zoom_level - self.current_zoom_level
-            if abs(zoom_diff) > 0.05:
-                zoom_step = zoom_diff * self.multi_config.zoom_speed
+            if self._zoom_adjusting:
+                self._zoom_adjusting = abs(zoom_diff) > self._zoom_exit
+            else:
+                self._zoom_adjusting = abs(zoom_diff) > self._zoom_enter
+            
+            if self._zoom_adjusting and (current_time - self._last_zoom_cmd_ts) >= self._zoom_min_interval:
+                zoom_step = zoom_diff * self._zoom_speed
                 new_zoom = self.current_zoom_level + zoom_step
                 
                 self._send_zoom_command(new_zoom)
+                self._last_zoom_cmd_ts = current_time
                 
                 # Registrar cambio de zoom
-                self.zoom_history.append({
-                    'timestamp': time.time(),
-                    'old_zoom': self.current_zoom_level,
-                    'new_zoom': new_zoom,
-                    'target_id': self.current_target_id,
-                    'object_ratio': object_ratio
-                })
+                self._zoom_n += 1
+                self._zoom_sum += new_zoom
+                self._zoom_min = min(self._zoom_min, new_zoom)
+                self._zoom_max = max(self._zoom_max, new_zoom)
                 
                 self.current_zoom_level = new_zoom
                 self.zoom_change_count += 1
@@ -886,120 +1637,111 @@ class MultiObjectPTZTracker:
                     self.on_zoom_changed(self.current_zoom_level, object_ratio)
             
         except Exception as e:
-            self.logger.error(f"Error en auto-zoom: {e}")
+            self.logger.error("Error en auto-zoom: %s", e)
     
     def _send_zoom_command(self, zoom_level: float):
-        """Enviar comando de zoom a la cámara"""
+        """Enviar comando de zoom a la cámara (por el hilo de envío si el seguimiento está activo)"""
+        if self._zoom_req is None:
+            return
+        
+        if self._sender_threads:
+            self._offer_command(self._zoom_queue,
+                                (self._soap_absolute_zoom, (zoom_level, self._zoom_speed)))
+        else:
+            self._soap_absolute_zoom(zoom_level, self._zoom_speed)
+    
+    def _soap_absolute_zoom(self, zoom_level: float, zoom_speed: float):
+        """Llamada SOAP AbsoluteMove de zoom"""
         try:
-            if not self.ptz_service or not self.profile_token:
-                return
-            
-            # Crear request de zoom absoluto
-            request = self.ptz_service.create_type('AbsoluteMove')
-            request.ProfileToken = self.profile_token
-            
-            # Configurar zoom (mantener pan/tilt actuales)
-            request.Position = {
-                'Zoom': {'x': zoom_level}
-            }
-            
-            # Configurar velocidad de zoom
-            request.Speed = {
-                'Zoom': {'x': self.multi_config.zoom_speed}
-            }
+            # Configurar zoom y su velocidad
+            self._zoom_req.Position['Zoom']['x'] = zoom_level
+            self._zoom_req.Speed['Zoom']['x'] = zoom_speed
             
             # Enviar comando
-            self.ptz_service.AbsoluteMove(request)
+            with self._soap_lock:
+                self.ptz_service.AbsoluteMove(self._zoom_req)
             
-        except Exception as e:
-            self.logger.error(f"Error enviando comando de zoom: {e}")
+        except PTZ_COMMAND_ERRORS as e:
+            self.logger.error("Error enviando comando de zoom: %s", e)
     
-    def get_status(self) -> Dict[str, Any]:
-        """Obtener estado completo del tracker"""
-        current_time = time.time()
+    def get_status_snapshot(self) -> _TrackerStatus:
+        """Obtener estado completo del tracker sin construir diccionarios.
         
-        # Información de objetos rastreados
-        objects_info = {}
+        La instancia devuelta se reutiliza y se sobrescribe en cada llamada.
+        """
+        current_time = time.time()
+        status = self._status
+        
+        status.timestamp = current_time
+        status.state = self.state.value if hasattr(self.state, 'value') else str(self.state)
+        status.tracking_active = self.tracking_active
+        status.ip = self.ip
+        status.port = self.port
+        status.connected = self.camera is not None
+        status.current_target_id = self.current_target_id
+        status.is_following_primary = self.is_following_primary
+        
+        # Información de objetos rastreados, actualizada en el lugar
+        objects_info = status.objects
+        _prune_missing(objects_info, self.tracked_objects)
         for obj_id, obj in self.tracked_objects.items():
-            current_pos = obj.get_current_position()
-            objects_info[obj_id] = {
-                'position': {
-                    'cx': current_pos.cx if current_pos else None,
-                    'cy': current_pos.cy if current_pos else None,
-                    'width': current_pos.width if current_pos else None,
-                    'height': current_pos.height if current_pos else None
-                },
-                'confidence': obj.get_average_confidence(),
-                'priority': obj.priority_score,
-                'is_moving': obj.is_moving,
-                'movement_speed': obj.movement_speed,
-                'is_primary': obj.is_primary_target,
-                'time_tracked': obj.time_being_tracked,
-                'frames_tracked': obj.frames_tracked
-            }
+            entry = objects_info.get(obj_id)
+            if entry is None:
+                entry = objects_info[obj_id] = _StatusObject()
+            entry.update_from(obj)
+        
+        status.zoom_level = self.current_zoom_level
+        status.target_zoom_level = self.target_zoom_level
+        status.pan_speed = self.current_pan_speed
+        status.tilt_speed = self.current_tilt_speed
+        
+        status.session_duration = current_time - self.session_start_time
+        status.total_detections = self.total_detections_processed
+        status.successful_tracks = self.successful_tracks
+        status.failed_tracks = self.failed_tracks
+        status.switch_count = self.switch_count
+        status.zoom_changes = self.zoom_change_count
+        
+        cfg = self.multi_config
+        status.alternating_enabled = cfg.alternating_enabled
+        status.auto_zoom_enabled = cfg.auto_zoom_enabled
+        status.max_objects = cfg.max_objects_to_track
+        status.primary_follow_time = cfg.primary_follow_time
+        status.secondary_follow_time = cfg.secondary_follow_time
+        return status
+    
+    def get_status(self) -> Dict[str, Any]:
+        """Obtener estado completo del tracker como diccionario"""
+        status = self.get_status_snapshot()
         
-        return {
-            'timestamp': current_time,
-            'state': self.state.value if hasattr(self.state, 'value') else str(self.state),
-            'tracking_active': self.tracking_active,
-            'camera_info': {
-                'ip': self.ip,
-                'port': self.port,
-                'connected': self.camera is not None
-            },
-            'current_target': {
-                'id': self.current_target_id,
-                'is_primary': self.is_following_primary
-            },
-            'objects': objects_info,
-            'zoom': {
-                'current_level': self.current_zoom_level,
-                'target_level': self.target_zoom_level
-            },
-            'movement': {
-                'pan_speed': self.current_pan_speed,
-                'tilt_speed': self.current_tilt_speed
-            },
-            'statistics': {
-                'session_duration': current_time - self.session_start_time,
-                'total_detections': self.total_detections_processed,
-                'successful_tracks': self.successful_tracks,
-                'failed_tracks': self.failed_tracks,
-                'switch_count': self.switch_count,
-                'zoom_changes': self.zoom_change_count,
-                'objects_count': len(self.tracked_objects)
-            },
-            'configuration': {
-                'alternating_enabled': self.multi_config.alternating_enabled,
-                'auto_zoom_enabled': self.multi_config.auto_zoom_enabled,
-                'max_objects': self.multi_config.max_objects_to_track,
-                'primary_follow_time': self.multi_config.primary_follow_time,
-                'secondary_follow_time': self.multi_config.secondary_follow_time
-            }
-        }
+        # Los diccionarios por objeto se reutilizan entre llamadas; solo cambian altas y bajas
+        cache = self._objects_info_cache
+        _prune_missing(cache, status.objects)
+        for obj_id, obj in status.objects.items():
+            cache[obj_id] = obj.fill_dict(cache.get(obj_id, {}))
+        
+        return status.to_dict(objects_info=dict(cache))
     
     def get_tracking_statistics(self) -> Dict[str, Any]:
         """Obtener estadísticas detalladas de seguimiento"""
         current_time = time.time()
         
         # Calcular estadísticas de movimiento PTZ
+        n_moves = min(self._hist_idx, PTZ_HISTORY_SIZE)
         ptz_stats = {
-            'total_movements': len(self.ptz_movement_history),
+            'total_movements': n_moves,
             'average_pan_speed': 0.0,
             'average_tilt_speed': 0.0,
             'max_pan_speed': 0.0,
             'max_tilt_speed': 0.0
         }
         
-        if self.ptz_movement_history:
-            pan_speeds = [move['pan_speed'] for move in self.ptz_movement_history]
-            tilt_speeds = [move['tilt_speed'] for move in self.ptz_movement_history]
-            
+        if n_moves:
             ptz_stats.update({
-                'average_pan_speed': sum(pan_speeds) / len(pan_speeds),
-                'average_tilt_speed': sum(tilt_speeds) / len(tilt_speeds),
-                'max_pan_speed': max(abs(s) for s in pan_speeds),
-                'max_tilt_speed': max(abs(s) for s in tilt_speeds)
+                'average_pan_speed': self._pan_sum / n_moves,
+                'average_tilt_speed': self._tilt_sum / n_moves,
+                'max_pan_speed': self._pan_abs_max[0][1],
+                'max_tilt_speed': self._tilt_abs_max[0][1]
             })
         
         # Calcular estadísticas de zoom
@@ -1010,29 +1752,33 @@ class MultiObjectPTZTracker:
             'max_used': self.multi_config.max_zoom_level
         }
         
-        if self.zoom_history:
-            zoom_levels = [change['new_zoom'] for change in self.zoom_history]
+        if self._zoom_n:
             zoom_stats.update({
-                'min_used': min(zoom_levels),
-                'max_used': max(zoom_levels),
-                'average_level': sum(zoom_levels) / len(zoom_levels)
+                'min_used': self._zoom_min,
+                'max_used': self._zoom_max,
+                'average_level': self._zoom_sum / self._zoom_n
             })
         
         # Estadísticas de objetos
+        n_objects = len(self.tracked_objects)
         object_stats = {
-            'total_tracked': len(self.tracked_objects),
-            'with_movement': sum(1 for obj in self.tracked_objects.values() if obj.is_moving),
+            'total_tracked': n_objects,
+            'with_movement': self._moving_count,
             'average_confidence': 0.0,
             'average_size': 0.0
         }
         
-        if self.tracked_objects:
-            confidences = [obj.get_average_confidence() for obj in self.tracked_objects.values()]
-            sizes = [obj.get_object_size_ratio() for obj in self.tracked_objects.values()]
+        if n_objects:
+            # Una sola pasada: filas [confianza, ratio de tamaño]
+            values = np.fromiter(
+                ((obj.average_confidence, obj.get_object_size_ratio())
+                 for obj in self.tracked_objects.values()),
+                dtype=np.dtype((np.float64, 2)), count=n_objects)
+            average_confidence, average_size = values.mean(axis=0).tolist()
             
             object_stats.update({
-                'average_confidence': sum(confidences) / len(confidences),
-                'average_size': sum(sizes) / len(sizes)
+                'average_confidence': average_confidence,
+                'average_size': average_size
             })
         
         return {
@@ -1052,26 +1798,29 @@ class MultiObjectPTZTracker:
         try:
             self.stop_tracking()
             
-            # Detener movimiento PTZ
-            if self.ptz_service and self.profile_token:
-                try:
-                    request = self.ptz_service.create_type('Stop')
-                    request.ProfileToken = self.profile_token
-                    request.PanTilt = True
-                    request.Zoom = True
-                    self.ptz_service.Stop(request)
-                except:
-                    pass
+            # Detener movimiento PTZ (los hilos de envío ya terminaron: llamada directa)
+            self._stop_movement()
             
             # Limpiar datos
+            for obj in self.tracked_objects.values():
+                obj.detach_slot()
             self.tracked_objects.clear()
-            self.ptz_movement_history.clear()
-            self.zoom_history.clear()
+            self._moving_count = 0
+            self._free_slots = list(range(len(self._prio_buf) - 1, -1, -1))
+            self._last_seen_arr.fill(np.inf)
+            self._hist_idx = 0
+            self._pan_sum = self._tilt_sum = 0.0
+            self._pan_abs_max.clear()
+            self._tilt_abs_max.clear()
+            self._zoom_n = 0
+            self._zoom_sum = 0.0
+            self._zoom_min = math.inf
+            self._zoom_max = -math.inf
             
             self.logger.info("Tracker limpiado")
             
         except Exception as e:
-            self.logger.error(f"Error limpiando tracker: {e}")
+            self.logger.error("Error limpiando tracker: %s", e)
 
 # ===== FUNCIONES DE UTILIDAD =====
 
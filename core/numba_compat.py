@@ -0,0 +1,22 @@
+# core/numba_compat.py - Compatibilidad opcional con Numba
+"""
+Numba acelera los kernels numéricos pequeños del seguimiento, pero no es una
+dependencia obligatoria. Si no está instalado, `njit` devuelve la función sin
+compilar y `prange` es `range`, de modo que el mismo código corre en Python puro.
+"""
+
+try:
+    from numba import njit, prange
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+    prange = range
+
+    def njit(*args, **kwargs):
+        """Sustituto de numba.njit que no compila"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+
+        def decorator(func):
+            return func
+        return decorator
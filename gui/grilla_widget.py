@@ -12,13 +12,19 @@ from core.rtsp_builder import generar_rtsp
 from core.analytics_processor import AnalyticsProcessor
 from gui.video_saver import VideoSaverThread
 from core.cross_line_counter import CrossLineCounter
+from core.geom_numba import point_seg_dist
+from core.frame_numba import copy_rows
+from core.log_writer import get_line_writer
+from core.box_records import boxes_to_records, box_centers, alert_tuples
 from core.ptz_control import PTZCameraONVIF
-from collections import defaultdict, deque
+from functools import lru_cache
+import dataclasses
 import numpy as np
 from datetime import datetime
 import uuid
 import json
 import os
+import sys
 import time
 
 # NUEVA IMPORTACIÓN: Sistema de muestreo adaptativo
@@ -29,13 +35,84 @@ except ImportError:
     ADAPTIVE_SAMPLING_AVAILABLE = False
     print("⚠️ Muestreo adaptativo no disponible - usando muestreo fijo")
 
+# orjson parsea config.json más rápido si está instalado; json.loads también acepta bytes
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
+
 DEBUG_LOGS = False  # Deshabilitado para producción
 
 CONFIG_FILE_PATH = "config.json"
+EVENT_LOG_PATH = "eventos_detectados.txt"
+# Espera (ms) antes de escribir en config.json los cambios de celdas acumulados
+CONFIG_SAVE_DELAY_MS = 500
+
+# Nombre de clase para los logs según (cámara con modelo "Embarcaciones", cls)
+_CLASS_NAMES = {
+    (True, 1): "Embarcación",
+    (False, 0): "Persona",
+    (True, 2): "Auto", (False, 2): "Auto",
+    (True, 8): "Barco", (False, 8): "Barco",
+    (True, 9): "Barco", (False, 9): "Barco",
+}
+
+@lru_cache(maxsize=4)
+def _load_config_cached(path, mtime_ns, size):
+    """Parsear un archivo JSON; (mtime_ns, size) en la clave invalida la caché si cambia"""
+    with open(path, 'rb') as f:
+        return _json_loads(f.read())
+
+def _load_config(path=CONFIG_FILE_PATH):
+    """Configuración parseada, compartida entre widgets (solo lectura); se relee si el archivo cambió"""
+    st = os.stat(path)
+    return _load_config_cached(path, st.st_mtime_ns, st.st_size)
+
+# Muestras de tiempo de procesamiento promediadas para el estado del muestreo
+PROCESSING_TIME_WINDOW = 20
+
+# Centros recordados por clase para decidir si un objeto se ha movido
+MOVEMENT_HISTORY_SIZE = 16
+
+# Formatos de vídeo RGB que se leen directamente como QImage, con su QImage.Format
+# (los nombres que no existan en la versión de Qt instalada se omiten)
+_RGB_PIXEL_FORMATS = {
+    fmt: QVideoFrameFormat.imageFormatFromPixelFormat(fmt)
+    for name in (
+        "Format_RGB24", "Format_RGB32", "Format_BGR24", "Format_BGR32",
+        "Format_RGBX8888", "Format_RGBA8888", "Format_BGRX8888",
+        "Format_BGRA8888", "Format_ARGB32",
+    )
+    if (fmt := getattr(QVideoFrameFormat.PixelFormat, name, None)) is not None
+}
+
+# Formatos QImage que se copian al buffer de frames sin convertToFormat:
+# bytes por píxel y slice de los bytes R, G, B dentro de cada píxel.
+# RGB32/ARGB32 son enteros 0xAARRGGBB, así que su orden en memoria depende del endianness
+_XRGB32_RGB = slice(2, None, -1) if sys.byteorder == "little" else slice(1, 4)
+_QIMAGE_RGB_LAYOUT = {
+    QImage.Format.Format_RGB888: (3, slice(0, 3)),
+    QImage.Format.Format_BGR888: (3, slice(2, None, -1)),
+    QImage.Format.Format_RGBX8888: (4, slice(0, 3)),
+    QImage.Format.Format_RGBA8888: (4, slice(0, 3)),
+    QImage.Format.Format_RGB32: (4, _XRGB32_RGB),
+    QImage.Format.Format_ARGB32: (4, _XRGB32_RGB),
+}
+
+# Color RGBA de las líneas de la grilla
+GRID_LINE_RGBA = (100, 100, 100, 100)
+
+# Frames previos y posteriores a un cruce de línea que se guardan en el video
+FRAME_BUFFER_SIZE = 50
 
 class GrillaWidget(QWidget):
     log_signal = pyqtSignal(str)
 
+    # Intervalos para la configuración FPS por defecto (ui_update_fps=15, visual_fps=25);
+    # solo se sobrescriben en la instancia si su fps_config es distinta
+    PAINT_UPDATE_INTERVAL = 66
+    UI_UPDATE_INTERVAL = 1
+
     def __init__(self, filas=18, columnas=22, area=None, parent=None, fps_config=None):
         super().__init__(parent)
         self.filas = filas
@@ -50,13 +127,18 @@ class GrillaWidget(QWidget):
         self.discarded_cells = set()
         self.cell_presets = {}
         self.cell_ptz_map = {}
+        self._rebuild_cell_grids()
         self.ptz_objects = {}
         self.credentials_cache = {}
         self.ptz_cameras = []
 
         self.cam_data = None
         self.alertas = None
+        # Centros previos por clase: buffer circular (MOVEMENT_HISTORY_SIZE, 2) int32
+        # con su posición de escritura y número de filas válidas
         self.objetos_previos = {}
+        self._objetos_previos_head = {}
+        self._objetos_previos_count = {}
         self.umbral_movimiento = 20
         self.detectors = None 
         self.analytics_processor = AnalyticsProcessor(self)
@@ -78,7 +160,10 @@ class GrillaWidget(QWidget):
         self.current_detection_interval = self.fixed_detection_interval
         
         # Métricas para muestreo adaptativo
-        self.frame_processing_times = deque(maxlen=20)
+        # Tiempos de procesamiento recientes (buffer circular de PROCESSING_TIME_WINDOW muestras)
+        self._pt_ring = np.zeros(PROCESSING_TIME_WINDOW, dtype=np.float32)
+        self._pt_head = 0
+        self._pt_count = 0
         self.last_detection_count = 0
         self.movement_metrics = {"moving_objects": 0, "total_objects": 0, "average_speed": 0.0}
         
@@ -86,8 +171,7 @@ class GrillaWidget(QWidget):
         self._setup_adaptive_sampling()
         
         # Calcular intervalos basados en FPS deseados
-        self.PAINT_UPDATE_INTERVAL = int(1000 / fps_config["ui_update_fps"])
-        self.UI_UPDATE_INTERVAL = max(1, int(30 / fps_config["visual_fps"]))
+        self._apply_update_intervals(fps_config["visual_fps"], fps_config["ui_update_fps"])
 
         self.cross_counter = CrossLineCounter()
         self.cross_counter.counts_updated.connect(self._update_cross_counts)
@@ -102,7 +186,9 @@ class GrillaWidget(QWidget):
         self._dragging_line = None
         self._last_mouse_pos = None
 
-        self.frame_buffer = deque(maxlen=50)
+        # Buffer circular de frames (FRAME_BUFFER_SIZE, H, W, 3); se reserva con el primer frame
+        self.frame_buffer = None
+        self._frame_seq = 0  # Frames escritos en el buffer actual
         self.pending_videos = []
         self.active_video_threads = []
 
@@ -112,6 +198,8 @@ class GrillaWidget(QWidget):
         self.setSizePolicy(QSizePolicy.Policy.Fixed, QSizePolicy.Policy.Fixed)
 
         self._grid_lines_pixmap = None
+        self._init_paint_resources()
+        self._update_cell_geometry()
         self._generate_grid_lines_pixmap()
 
         self.paint_update_timer = QTimer(self)
@@ -119,12 +207,22 @@ class GrillaWidget(QWidget):
         self.paint_update_timer.timeout.connect(self.perform_paint_update)
         self.paint_scheduled = False
 
+        # Guardado diferido de config.json: varias ediciones seguidas escriben una sola vez
+        self._dirty_config_sections = set()
+        self._config_timer = QTimer(self)
+        self._config_timer.setSingleShot(True)
+        self._config_timer.setInterval(CONFIG_SAVE_DELAY_MS)
+        self._config_timer.timeout.connect(self._flush_config)
+
         self.ui_frame_counter = 1
         
         # Contadores para estadísticas
         self.detection_count = 0
         self.total_frames_processed = 0
         self.frames_skipped_adaptive = 0
+        # Ventana de salto del muestreo adaptativo: frame analizado y primer frame fuera
+        self._skip_from = 0
+        self._skip_until = 0
 
     def _setup_adaptive_sampling(self):
         """Configura el sistema de muestreo adaptativo"""
@@ -138,10 +236,11 @@ class GrillaWidget(QWidget):
             
             # Crear controlador adaptativo
             self.adaptive_controller = AdaptiveSamplingController(adaptive_config)
+            self._attach_adaptive_controller()
             self.adaptive_controller.enable()  # Activar el controlador
             self.adaptive_sampling_enabled = True
             
-            self.registrar_log(f"✅ Muestreo adaptativo inicializado (base: {adaptive_config.get('base_interval', 10)})")
+            self.registrar_log(f"✅ Muestreo adaptativo inicializado (base: {adaptive_config.base_interval})")
             
         except Exception as e:
             self.registrar_log(f"❌ Error configurando muestreo adaptativo: {e}")
@@ -150,52 +249,44 @@ class GrillaWidget(QWidget):
     def _load_adaptive_config(self):
         """Carga la configuración del muestreo adaptativo"""
         try:
-            # Intentar cargar desde config.json
-            if os.path.exists(CONFIG_FILE_PATH):
-                with open(CONFIG_FILE_PATH, 'r') as f:
-                    config_data = json.load(f)
-                
-                # Buscar configuración específica de muestreo adaptativo
-                adaptive_config = config_data.get("adaptive_sampling", {})
-                
-                # Si no existe, usar configuración específica de la cámara actual
-                if not adaptive_config and self.cam_data:
-                    cam_ip = self.cam_data.get("ip")
-                    for cam in config_data.get("camaras", []):
-                        if cam.get("ip") == cam_ip:
-                            adaptive_config = cam.get("adaptive_sampling", {})
-                            break
-                
-                # Combinar con configuración por defecto
-                default_config = AdaptiveSamplingConfig.create_config("balanced")
-                # Convertir a dict para poder hacer update
-                default_dict = {
-                    'base_interval': default_config.base_interval,
-                    'min_interval': default_config.min_interval,
-                    'max_interval': default_config.max_interval,
-                    'adaptation_rate': default_config.adaptation_rate,
-                    'detection_weight': default_config.detection_weight,
-                    'movement_weight': default_config.movement_weight,
-                    'high_activity_threshold': default_config.high_activity_threshold,
-                    'low_activity_threshold': default_config.low_activity_threshold,
-                    'history_window': default_config.history_window,
-                    'stabilization_time': default_config.stabilization_time,
-                    'min_detections_for_adaptation': default_config.min_detections_for_adaptation,
-                    'confidence_threshold': default_config.confidence_threshold,
-                    'enable_burst_mode': default_config.enable_burst_mode,
-                    'burst_duration': default_config.burst_duration,
-                    'enable_smoothing': default_config.enable_smoothing
-                }
-                default_dict.update(adaptive_config)
-                
-                return AdaptiveSamplingConfig(**default_dict)
+            # Intentar cargar desde config.json (el stat de _load_config detecta si no existe)
+            config_data = _load_config()
+            
+            # Buscar configuración específica de muestreo adaptativo
+            adaptive_config = config_data.get("adaptive_sampling", {})
+            
+            # Si no existe, usar configuración específica de la cámara actual
+            if not adaptive_config and self.cam_data:
+                cam_ip = self.cam_data.get("ip")
+                for cam in config_data.get("camaras", []):
+                    if cam.get("ip") == cam_ip:
+                        adaptive_config = cam.get("adaptive_sampling", {})
+                        break
             
+            # Combinar con configuración por defecto
+            default_config = AdaptiveSamplingConfig.create_config("balanced")
+            return dataclasses.replace(default_config, **adaptive_config)
+            
+        except FileNotFoundError:
+            pass
         except Exception as e:
             self.registrar_log(f"⚠️ Error cargando config adaptativo: {e}")
         
         # Fallback: configuración por defecto
         return AdaptiveSamplingConfig.create_config("balanced")
 
+    def _apply_update_intervals(self, visual_fps, ui_update_fps):
+        """Fijar los intervalos de pintado y de UI; los valores por defecto quedan en la clase"""
+        intervals = (
+            ("PAINT_UPDATE_INTERVAL", int(1000 / ui_update_fps)),
+            ("UI_UPDATE_INTERVAL", max(1, int(30 / visual_fps))),
+        )
+        for name, value in intervals:
+            if value == getattr(GrillaWidget, name):
+                vars(self).pop(name, None)
+            else:
+                setattr(self, name, value)
+
     def set_fps_config(self, visual_fps=25, detection_fps=8, ui_update_fps=15):
         """Actualizar configuración de FPS en tiempo real"""
         self.fps_config = {
@@ -206,8 +297,7 @@ class GrillaWidget(QWidget):
         
         # Actualizar intervalos fijos (fallback)
         self.fixed_detection_interval = max(1, int(30 / detection_fps))
-        self.PAINT_UPDATE_INTERVAL = int(1000 / ui_update_fps)
-        self.UI_UPDATE_INTERVAL = max(1, int(30 / visual_fps))
+        self._apply_update_intervals(visual_fps, ui_update_fps)
         
         # Actualizar configuración del sistema adaptativo si está disponible
         if self.adaptive_sampling_enabled and self.adaptive_controller:
@@ -231,6 +321,7 @@ class GrillaWidget(QWidget):
                 enable_smoothing=True
             )
             self.adaptive_controller.update_config(adaptive_config_update)
+            self._skip_until = 0
             self.registrar_log(f"🧠 Muestreo adaptativo actualizado - Base: {new_base_interval}")
         
         if hasattr(self, 'visualizador') and self.visualizador:
@@ -252,8 +343,10 @@ class GrillaWidget(QWidget):
                 self.adaptive_controller.update_config(config)
             else:
                 self.adaptive_controller = AdaptiveSamplingController(config)
+                self._attach_adaptive_controller()
                 self.adaptive_controller.enable()
                 self.adaptive_sampling_enabled = True
+            self._skip_until = 0
             
             self.registrar_log(f"✅ Configuración de muestreo adaptativo actualizada")
             self.registrar_log(f"   📊 Base: {config.base_interval}, Min: {config.min_interval}, Max: {config.max_interval}")
@@ -270,11 +363,13 @@ class GrillaWidget(QWidget):
             return
         
         self.adaptive_sampling_enabled = enabled
+        self._skip_until = 0
         
         if enabled:
             if not self.adaptive_controller:
                 self._setup_adaptive_sampling()
             else:
+                self._attach_adaptive_controller()
                 self.adaptive_controller.enable()
             self.registrar_log("🧠 Muestreo adaptativo ACTIVADO")
         else:
@@ -292,49 +387,71 @@ class GrillaWidget(QWidget):
                 "activity_score": 0.0,
                 "avg_detections": 0.0,
                 "frames_processed": self.total_frames_processed,
-                "frames_skipped": self.frames_skipped_adaptive
+                "frames_skipped": self.frames_skipped_adaptive,
+                "avg_processing_time": self.get_average_processing_time()
             }
         
+        # Los contadores de frames del widget incluyen la ventana de salto en curso
         status = self.adaptive_controller.get_status()
+        frames_analyzed = self.total_frames_processed - self.frames_skipped_adaptive
         status.update({
             "enabled": True,
             "mode": "adaptive",
             "frames_processed": self.total_frames_processed,
-            "frames_skipped": self.frames_skipped_adaptive
+            "frames_analyzed": frames_analyzed,
+            "frames_skipped": self.frames_skipped_adaptive,
+            "efficiency_percent": (self.frames_skipped_adaptive / self.total_frames_processed * 100
+                                   if self.total_frames_processed else 0.0),
+            "avg_processing_time": self.get_average_processing_time()
         })
         return status
 
+    def get_average_processing_time(self):
+        """Tiempo medio (s) de las últimas detecciones procesadas en actualizar_boxes"""
+        if not self._pt_count:
+            return 0.0
+        return float(self._pt_ring[:self._pt_count].mean())
+
+    def _attach_adaptive_controller(self):
+        """Suscribirse a los cambios de intervalo del controlador adaptativo"""
+        self.adaptive_controller.on_interval_change = self._on_adaptive_interval_change
+        self.current_detection_interval = self.adaptive_controller.get_current_interval()
+
+    def _on_adaptive_interval_change(self, interval):
+        """Nuevo intervalo del controlador: recalcular la ventana de salto en curso"""
+        self.current_detection_interval = interval
+        self._skip_until = self._skip_from + interval
+
     def should_analyze_frame_adaptive(self, frame_number, detections=None):
         """Determina si un frame debe ser analizado usando muestreo adaptativo o fijo"""
         self.total_frames_processed += 1
         
         if self.adaptive_sampling_enabled and self.adaptive_controller:
-            # Usar sistema adaptativo
+            # Dentro de la ventana de salto decidida en el último análisis:
+            # basta una comparación entera, sin pasar por el controlador
+            if frame_number < self._skip_until:
+                self.frames_skipped_adaptive += 1
+                return False
+            
+            # Usar sistema adaptativo: el controlador actualiza la actividad y
+            # el intervalo K; este frame se analiza y se saltan los K-1 siguientes.
+            # Recibe los frames transcurridos desde el último análisis para contar
+            # los saltados (solo este si la ventana se reinició al cambiar la configuración);
+            # current_detection_interval lo mantiene _on_adaptive_interval_change
+            frames = frame_number - self._skip_from if self._skip_until else 1
+            self._skip_from = frame_number
             if detections:
-                # Convertir detecciones al formato esperado
-                formatted_detections = []
-                for detection in detections:
-                    if isinstance(detection, dict):
-                        formatted_detections.append({
-                            'conf': detection.get('conf', 0),
-                            'cls': detection.get('cls', 0),
-                            'bbox': detection.get('bbox', (0, 0, 0, 0))
-                        })
-                
-                # Determinar si hay movimiento
-                has_movement = any(det.get('moving', False) for det in detections if isinstance(det, dict))
-                should_analyze = self.adaptive_controller.should_process_frame(formatted_detections, has_movement)
+                # El controlador solo lee 'conf' de cada detección: se pasan los dicts originales
+                dict_detections = [det for det in detections if isinstance(det, dict)]
+                has_movement = any(det.get('moving', False) for det in dict_detections)
+                self.adaptive_controller.update_activity(dict_detections, has_movement, frames)
             else:
                 # Sin detecciones específicas, usar comportamiento por defecto
-                should_analyze = self.adaptive_controller.should_process_frame()
+                self.adaptive_controller.update_activity(frames=frames)
             
-            if not should_analyze:
-                self.frames_skipped_adaptive += 1
+            self._skip_until = frame_number + self.current_detection_interval
             
-            # Actualizar intervalo actual para estadísticas
-            self.current_detection_interval = self.adaptive_controller.get_current_interval()
-            
-            return should_analyze
+            return True
         else:
             # Usar sistema fijo tradicional
             should_analyze = (frame_number % self.fixed_detection_interval) == 0
@@ -378,10 +495,12 @@ class GrillaWidget(QWidget):
         
         # Registrar tiempo de procesamiento
         if processing_time:
-            self.frame_processing_times.append(processing_time)
+            self._pt_ring[self._pt_head] = processing_time
+            self._pt_head = (self._pt_head + 1) % PROCESSING_TIME_WINDOW
+            self._pt_count = min(self._pt_count + 1, PROCESSING_TIME_WINDOW)
         
         # CORRECCIÓN: El AdaptiveSamplingController actualiza sus métricas automáticamente
-        # cuando se llama a should_process_frame(). No necesitamos llamar a un método separado.
+        # cuando se llama a update_activity(). No necesitamos llamar a un método separado.
         
         # Log de debug ocasional
         if DEBUG_LOGS and self.total_frames_processed % 100 == 0:
@@ -395,7 +514,8 @@ class GrillaWidget(QWidget):
         self.cross_counter.active = True
         self.cross_counts.clear()
         self.cross_counter.prev_sides.clear()
-        self.cross_counter.counts = {"Entrada": defaultdict(int), "Salida": defaultdict(int)}
+        for direction_counts in self.cross_counter.counts.values():
+            direction_counts.clear()
         self.request_paint_update()
 
     def disable_cross_line(self):
@@ -403,7 +523,8 @@ class GrillaWidget(QWidget):
         self.cross_counter.active = False
         self.cross_counts.clear()
         self.cross_counter.prev_sides.clear()
-        self.cross_counter.counts = {"Entrada": defaultdict(int), "Salida": defaultdict(int)}
+        for direction_counts in self.cross_counter.counts.values():
+            direction_counts.clear()
         self.request_paint_update()
 
     def start_line_edit(self):
@@ -429,18 +550,68 @@ class GrillaWidget(QWidget):
         now = datetime.now()
         fecha = now.strftime("%Y-%m-%d")
         hora = now.strftime("%H-%M-%S")
+        # El directorio lo crea VideoSaverThread: ningún syscall de disco en el hilo de la GUI
         ruta = os.path.join("capturas", "videos", fecha)
-        os.makedirs(ruta, exist_ok=True)
         nombre = f"{fecha}_{hora}_{uuid.uuid4().hex[:6]}.mp4"
         path_final = os.path.join(ruta, nombre)
-        frames_copy = list(self.frame_buffer)
+        # Array del video completo (previos + posteriores); los frames previos se copian
+        # ya porque el buffer circular los sobrescribe durante la grabación
+        frames = np.empty((2 * FRAME_BUFFER_SIZE,) + self.frame_buffer.shape[1:], dtype=np.uint8)
+        count = len(self._buffered_frames_since(self._frame_seq - FRAME_BUFFER_SIZE, out=frames))
         self.pending_videos.append({
-            "frames": frames_copy,
-            "frames_left": 50,
+            "frames": frames,
+            "count": count,
+            "buffer": self.frame_buffer,
+            "start": self._frame_seq,
+            "frames_left": FRAME_BUFFER_SIZE,
             "path": path_final,
         })
         self.registrar_log(f"🎥 Grabación iniciada: {nombre}")
 
+    def _store_qimage(self, img):
+        """Copiar un QImage como RGB al siguiente slot del buffer circular y devolver ese slot.
+
+        Devuelve None si el formato no está en _QIMAGE_RGB_LAYOUT (hay que convertirlo antes).
+        """
+        layout = _QIMAGE_RGB_LAYOUT.get(img.format())
+        if layout is None:
+            return None
+        bytes_per_pixel, rgb = layout
+        height, width, stride = img.height(), img.width(), img.bytesPerLine()
+        ptr = img.constBits()
+        ptr.setsize(img.sizeInBytes())
+        src = np.frombuffer(ptr, dtype=np.uint8)
+
+        shape = (height, width, 3)
+        buffer = self.frame_buffer
+        if buffer is None or buffer.shape[1:] != shape:
+            buffer = self.frame_buffer = np.empty((FRAME_BUFFER_SIZE,) + shape, dtype=np.uint8)
+            self._frame_seq = 0
+        slot = buffer[self._frame_seq % FRAME_BUFFER_SIZE]
+        if bytes_per_pixel == 3 and rgb.step is None:
+            copy_rows(src, slot, stride)
+        else:
+            # Vista (alto, ancho, bytes_per_pixel) sobre las líneas con relleno; el slice elige R, G, B
+            pixels = np.ndarray((height, width, bytes_per_pixel), dtype=np.uint8, buffer=src,
+                                strides=(stride, bytes_per_pixel, 1))
+            np.copyto(slot, pixels[:, :, rgb])
+        self._frame_seq += 1
+        return slot
+
+    def _buffered_frames_since(self, seq, out=None):
+        """Copia contigua, en orden, de los frames escritos desde `seq` que siguen en el buffer.
+
+        Con `out` los frames se escriben al principio de ese array y se devuelve la parte usada.
+        """
+        if self.frame_buffer is None:
+            return np.empty((0, 0, 0, 3), dtype=np.uint8)
+        order = np.arange(max(seq, self._frame_seq - FRAME_BUFFER_SIZE, 0), self._frame_seq)
+        if out is None:
+            return self.frame_buffer.take(order % FRAME_BUFFER_SIZE, axis=0)
+        dst = out[:len(order)]
+        np.take(self.frame_buffer, order % FRAME_BUFFER_SIZE, axis=0, out=dst)
+        return dst
+
     def perform_paint_update(self):
         self.paint_scheduled = False
         self.update()
@@ -451,43 +622,80 @@ class GrillaWidget(QWidget):
             self.paint_update_timer.start(self.PAINT_UPDATE_INTERVAL)
 
     def _point_to_segment_distance(self, p, a, b):
-        ax, ay = a.x(), a.y()
-        bx, by = b.x(), b.y()
-        px, py = p.x(), p.y()
-        dx = bx - ax
-        dy = by - ay
-        if dx == 0 and dy == 0:
-            return (p - a).manhattanLength()
-        t = ((px - ax) * dx + (py - ay) * dy) / (dx * dx + dy * dy)
-        t = max(0, min(1, t))
-        proj_x = ax + t * dx
-        proj_y = ay + t * dy
-        return ((px - proj_x) ** 2 + (py - proj_y) ** 2) ** 0.5
+        return point_seg_dist(p.x(), p.y(), a.x(), a.y(), b.x(), b.y())
 
     def resizeEvent(self, event):
         super().resizeEvent(event)
+        self._update_cell_geometry()
         self._generate_grid_lines_pixmap()
 
+    def _update_cell_geometry(self):
+        """Recalcular tamaño de celda, sus recíprocos y las líneas de la grilla para el tamaño actual"""
+        w, h = self.width(), self.height()
+        self._cell_w = w / self.columnas
+        self._cell_h = h / self.filas
+        self._inv_cell_w = 1.0 / self._cell_w if self._cell_w else 0.0
+        self._inv_cell_h = 1.0 / self._cell_h if self._cell_h else 0.0
+        # Filas/columnas de píxeles de las líneas (las que caen en el borde final quedan fuera)
+        ys = (np.arange(self.filas + 1) * self._cell_h).astype(np.intp)
+        xs = (np.arange(self.columnas + 1) * self._cell_w).astype(np.intp)
+        self._grid_ys = ys[ys < h]
+        self._grid_xs = xs[xs < w]
+
+    def _init_paint_resources(self):
+        """Colores, plumas y fuentes de paintEvent, creados una sola vez por widget"""
+        # Relleno de celdas según su estado
+        self._cell_discarded_color = QColor(200, 0, 0, 150)
+        self._cell_preset_color = QColor(0, 0, 255, 80)
+        self._cell_ptz_color = QColor(128, 0, 128, 80)
+        self._cell_selected_color = QColor(255, 0, 0, 100)
+        self._cell_temporal_color = QColor(0, 255, 0, 100)
+        self._cell_area_color = QColor(255, 165, 0, 100)
+
+        self._white_color = QColor("white")
+        self._yellow_color = QColor("yellow")
+        self._lightgray_color = QColor("lightgray")
+        self._black_color = QColor("black")
+        self._info_bg_color = QColor(0, 0, 0, 180)
+        self._label_bg_color = QColor(0, 0, 0, 200)
+
+        # Cajas de detección por nivel de confianza (alta, media, baja)
+        self._box_pens = []
+        for color_name in ("lime", "yellow", "orange"):
+            pen = QPen(QColor(color_name))
+            pen.setWidth(3)
+            self._box_pens.append(pen)
+
+        self._cross_line_pen = QPen(QColor('yellow'))
+        self._cross_line_pen.setWidth(3)
+        self._handle_pen = QPen(QColor('red'))
+        self._handle_pen.setWidth(4)
+        self._handle_brush = QBrush(QColor('red'))
+
+        self._cell_font = QFont(self.font())
+        self._cell_font.setPointSize(10)
+        self._ptz_preset_font = QFont(self.font())
+        self._ptz_preset_font.setPointSize(8)
+        self._info_font = QFont(self.font())
+        self._info_font.setPointSize(9)
+        self._box_font = QFont()
+        self._box_font.setPointSize(10)
+
     def _generate_grid_lines_pixmap(self):
         if self.width() <= 0 or self.height() <= 0:
             self._grid_lines_pixmap = None
             return
-        pixmap = QPixmap(self.size())
-        pixmap.fill(Qt.GlobalColor.transparent)
-        qp = QPainter(pixmap)
-        qp.setPen(QColor(100, 100, 100, 100))
-        cell_w = self.width() / self.columnas
-        cell_h = self.height() / self.filas
-        for row in range(self.filas + 1):
-            y = row * cell_h
-            qp.drawLine(0, int(y), self.width(), int(y))
-        for col in range(self.columnas + 1):
-            x = col * cell_w
-            qp.drawLine(int(x), 0, int(x), self.height())
-        qp.end()
-        self._grid_lines_pixmap = pixmap
+        # Líneas horizontales y verticales escritas como filas/columnas de un buffer RGBA
+        w, h = self.width(), self.height()
+        buf = np.zeros((h, w, 4), dtype=np.uint8)
+        buf[self._grid_ys] = GRID_LINE_RGBA
+        buf[:, self._grid_xs] = GRID_LINE_RGBA
+        image = QImage(buf.data, w, h, 4 * w, QImage.Format.Format_RGBA8888)
+        self._grid_lines_pixmap = QPixmap.fromImage(image)
 
     def mostrar_vista(self, cam_data):
+        # Cambios pendientes de la cámara anterior: guardarlos antes de cambiar cam_data
+        self._flush_config()
         if hasattr(self, 'visualizador') and self.visualizador: 
             self.visualizador.detener()
 
@@ -505,8 +713,7 @@ class GrillaWidget(QWidget):
         current_cam_ip = self.cam_data.get("ip")
         if current_cam_ip:
             try:
-                with open(CONFIG_FILE_PATH, 'r') as f:
-                    config_data = json.load(f)
+                config_data = _load_config()
                 
                 camaras_config = config_data.get("camaras", [])
                 
@@ -589,6 +796,8 @@ class GrillaWidget(QWidget):
             except Exception as e:
                 self.registrar_log(f"Error cargando configuración: {e}")
         
+        self._rebuild_cell_grids()
+        
         # MODIFICACIÓN: Inicializar GestorAlertas optimizado
         self.alertas = GestorAlertas(cam_id=str(uuid.uuid4())[:8], filas=self.filas, columnas=self.columnas)
         
@@ -651,63 +860,59 @@ class GrillaWidget(QWidget):
             )
             self.cross_counter.update_boxes(boxes, size)
         
-        # MODIFICACIÓN: Procesar detecciones con información completa de tracking
-        nuevas_detecciones_para_alertas = []
-        for box_data in boxes:
-            if not isinstance(box_data, dict):
-                continue
-
-            x1, y1, x2, y2 = box_data.get('bbox', (0, 0, 0, 0))
-            tracker_id = box_data.get('id')
-            cls = box_data.get('cls')
-            conf = box_data.get('conf', 0)
-            
-            cx = int((x1 + x2) / 2)
-            cy = int((y1 + y2) / 2)
-            current_cls_positions = self.objetos_previos.get(cls, [])
-            se_ha_movido = all(
-                abs(cx - prev_cx) > self.umbral_movimiento or abs(cy - prev_cy) > self.umbral_movimiento
-                for prev_cx, prev_cy in current_cls_positions
+        # MODIFICACIÓN: Procesar detecciones con información completa de tracking.
+        # Las detecciones con movimiento se guardan como índices de filas de `arr`
+        moving_idx = []
+        modelos_cam = []
+        if self.cam_data:
+            modelos_cam = self.cam_data.get("modelos") or [self.cam_data.get("modelo")]
+        has_embarcaciones = "Embarcaciones" in modelos_cam
+        box_dicts = [b for b in boxes if isinstance(b, dict)]
+        arr = boxes_to_records(box_dicts)
+        centers = box_centers(arr['bbox'])
+        for i, ((cx, cy), cls, conf) in enumerate(zip(
+                centers.tolist(), arr['cls'].tolist(), arr['conf'].tolist())):
+            tracker_id = box_dicts[i].get('id')
+            # Centros previos de la clase: se movió si se aleja de todos
+            prev_centers = self.objetos_previos.get(cls)
+            if prev_centers is None:
+                prev_centers = np.zeros((MOVEMENT_HISTORY_SIZE, 2), dtype=np.int32)
+                self.objetos_previos[cls] = prev_centers
+                self._objetos_previos_head[cls] = 0
+                self._objetos_previos_count[cls] = 0
+            n_prev = self._objetos_previos_count[cls]
+            se_ha_movido = n_prev == 0 or bool(
+                (np.abs(prev_centers[:n_prev] - (cx, cy)).max(axis=1) > self.umbral_movimiento).all()
             )
 
             if se_ha_movido:
-                # NUEVA ESTRUCTURA: Incluir track_id y confianza para el sistema optimizado
-                nuevas_detecciones_para_alertas.append((x1, y1, x2, y2, cls, cx, cy, tracker_id, conf)) 
-                current_cls_positions.append((cx, cy))
+                moving_idx.append(i)
+                head = self._objetos_previos_head[cls]
+                prev_centers[head] = (cx, cy)
+                self._objetos_previos_head[cls] = (head + 1) % MOVEMENT_HISTORY_SIZE
+                self._objetos_previos_count[cls] = min(n_prev + 1, MOVEMENT_HISTORY_SIZE)
                 
                 # Log de debug para verificar formato
                 if DEBUG_LOGS:
                     self.registrar_log(f"🔧 Detección preparada: Track={tracker_id}, cls={cls}, conf={conf:.2f}, coords=({cx},{cy})")
                 
-                # Determinar nombre de clase
-                modelos_cam = []
-                if self.cam_data:
-                    modelos_cam = self.cam_data.get("modelos") or [self.cam_data.get("modelo")]
-                
-                if "Embarcaciones" in modelos_cam and cls == 1:
-                    clase_nombre = "Embarcación"
-                elif cls == 0 and "Embarcaciones" not in modelos_cam:
-                    clase_nombre = "Persona"
-                elif cls == 2:
-                    clase_nombre = "Auto"
-                elif cls == 8 or cls == 9:
-                    clase_nombre = "Barco"
-                else:
-                    clase_nombre = f"Clase {cls}"
-                
                 conf_val = conf if isinstance(conf, (int, float)) else 0.0
                 
                 # Solo log para movimientos con confianza alta (reduce spam significativamente)
                 if conf_val >= 0.70:  # Solo mostrar detecciones de alta calidad
+                    clase_nombre = _CLASS_NAMES.get((has_embarcaciones, cls)) or f"Clase {cls}"
                     self.registrar_log(f"🟢 {clase_nombre} detectada (ID: {tracker_id}, Conf: {conf_val:.2f})")
-                    
-            self.objetos_previos[cls] = current_cls_positions[-10:]
 
-        # Log de debug del total de detecciones preparadas
-        if nuevas_detecciones_para_alertas:
-            self.registrar_log(f"📋 Total detecciones preparadas para alertas: {len(nuevas_detecciones_para_alertas)}")
-        elif DEBUG_LOGS:
-            self.registrar_log(f"📋 No hay detecciones con movimiento para procesar")
+        # Detecciones con movimiento en columnas (SoA): índices en box_dicts y sus registros
+        moving_idx = np.array(moving_idx, dtype=np.intp)
+        movidas = arr[moving_idx]
+
+        # Log de debug del total de detecciones preparadas (por frame: no formatear si no se emite)
+        if DEBUG_LOGS:
+            if moving_idx.size:
+                self.registrar_log(f"📋 Total detecciones preparadas para alertas: {moving_idx.size}")
+            else:
+                self.registrar_log("📋 No hay detecciones con movimiento para procesar")
 
         # MODIFICACIÓN: Filtrado de celdas mejorado con manejo de formato optimizado
         if self.alertas and self.last_frame is not None:
@@ -717,50 +922,45 @@ class GrillaWidget(QWidget):
                 cell_h_video = self.original_frame_size.height() / self.filas
 
                 if cell_w_video > 0 and cell_h_video > 0:
-                    for detection_data in nuevas_detecciones_para_alertas:
-                        # Extraer coordenadas del nuevo formato (x1, y1, x2, y2, cls, cx, cy, track_id, conf)
-                        x1_orig, y1_orig, x2_orig, y2_orig = detection_data[:4]
-                        
-                        cx_orig = (x1_orig + x2_orig) / 2
-                        cy_orig = (y1_orig + y2_orig) / 2
-
-                        if not (0 <= cx_orig < self.original_frame_size.width() and \
-                                0 <= cy_orig < self.original_frame_size.height()):
-                            detecciones_filtradas.append(detection_data)
-                            continue
-
-                        col_video = int(cx_orig / cell_w_video)
-                        row_video = int(cy_orig / cell_h_video)
-                        
-                        col_video = max(0, min(col_video, self.columnas - 1))
-                        row_video = max(0, min(row_video, self.filas - 1))
-
-                        if (row_video, col_video) not in self.discarded_cells:
-                            detecciones_filtradas.append(detection_data)
-                            cell_key = (row_video, col_video)
-                            if cell_key in self.cell_ptz_map:
-                                mapping = self.cell_ptz_map[cell_key]
-                                ip_tgt = mapping.get("ip")
-                                preset_tgt = mapping.get("preset")
-                                if ip_tgt and preset_tgt is not None:
-                                    self._trigger_ptz_move(ip_tgt, preset_tgt)
-                        elif DEBUG_LOGS:
-                            track_id = detection_data[7] if len(detection_data) > 7 else 'N/A'
-                            self.registrar_log(f"🔶 Track {track_id} ignorado - celda descartada ({row_video}, {col_video})")
+                    if moving_idx.size:
+                        # Centros y celdas de todas las detecciones a la vez, sobre la columna bbox
+                        coords = movidas['bbox']
+                        cx_orig = (coords[:, 0] + coords[:, 2]) * 0.5
+                        cy_orig = (coords[:, 1] + coords[:, 3]) * 0.5
+                        in_frame = ((cx_orig >= 0) & (cx_orig < self.original_frame_size.width()) &
+                                    (cy_orig >= 0) & (cy_orig < self.original_frame_size.height()))
+                        cols = np.clip((cx_orig / cell_w_video).astype(np.intp), 0, self.columnas - 1)
+                        rows = np.clip((cy_orig / cell_h_video).astype(np.intp), 0, self.filas - 1)
+
+                        # Fuera del frame se conservan sin celda; dentro, solo si la celda no está descartada
+                        in_cell = in_frame & ~self._discarded_mask[rows, cols]
+                        keep = ~in_frame | in_cell
+                        detecciones_filtradas = alert_tuples(box_dicts, moving_idx[keep], centers)
+
+                        targets = self._ptz_idx[rows[in_cell], cols[in_cell]]
+                        for target in targets[targets >= 0].tolist():
+                            ip_tgt, preset_tgt = self._ptz_targets[target]
+                            self._trigger_ptz_move(ip_tgt, preset_tgt)
+
+                        if DEBUG_LOGS:
+                            for i in np.flatnonzero(in_frame & ~in_cell).tolist():
+                                track_id = box_dicts[moving_idx[i]].get('id', 'N/A')
+                                self.registrar_log(f"🔶 Track {track_id} ignorado - celda descartada ({rows[i]}, {cols[i]})")
                 else: 
-                    detecciones_filtradas = list(nuevas_detecciones_para_alertas) 
+                    detecciones_filtradas = alert_tuples(box_dicts, moving_idx, centers)
             else: 
-                detecciones_filtradas = list(nuevas_detecciones_para_alertas)
+                detecciones_filtradas = alert_tuples(box_dicts, moving_idx, centers)
 
             # Limpiar periódicamente el historial de tracks inactivos
             if hasattr(self.alertas, 'limpiar_historial_tracks'):
-                tracks_activos = {box_data.get('id') for box_data in boxes if box_data.get('id') is not None}
+                tracks_activos = {tid for b in box_dicts if (tid := b.get('id')) is not None}
                 self.alertas.limpiar_historial_tracks(tracks_activos)
 
-            # Procesar con el sistema optimizado
+            # Procesar con el sistema optimizado. Las capturas se guardan en otro hilo,
+            # así que reciben una copia y no el slot del buffer circular
             self.alertas.procesar_detecciones(
                 detecciones_filtradas, 
-                self.last_frame,
+                self.last_frame.copy() if detecciones_filtradas else self.last_frame,
                 self.registrar_log,
                 self.cam_data
             )
@@ -815,23 +1015,11 @@ class GrillaWidget(QWidget):
 
         image = None
         numpy_frame = None
-        img_converted = None
 
         if frame.map(QVideoFrame.MapMode.ReadOnly):
             try:
-                pf = frame.pixelFormat()
-                rgb_formats = set()
-                for name in [
-                    "Format_RGB24", "Format_RGB32", "Format_BGR24", "Format_BGR32",
-                    "Format_RGBX8888", "Format_RGBA8888", "Format_BGRX8888", 
-                    "Format_BGRA8888", "Format_ARGB32",
-                ]:
-                    fmt = getattr(QVideoFrameFormat.PixelFormat, name, None)
-                    if fmt is not None:
-                        rgb_formats.add(fmt)
-
-                if pf in rgb_formats:
-                    img_format = QVideoFrameFormat.imageFormatFromPixelFormat(pf)
+                img_format = _RGB_PIXEL_FORMATS.get(frame.pixelFormat())
+                if img_format is not None:
                     if img_format != QImage.Format.Format_Invalid:
                         qimg = QImage(
                             frame.bits(),
@@ -841,14 +1029,10 @@ class GrillaWidget(QWidget):
                             img_format,
                         ).copy()
                         image = qimg
-                        img_converted = qimg.convertToFormat(QImage.Format.Format_RGB888)
-                        ptr = img_converted.constBits()
-                        ptr.setsize(img_converted.width() * img_converted.height() * 3)
-                        numpy_frame = (
-                            np.frombuffer(ptr, dtype=np.uint8)
-                            .reshape((img_converted.height(), img_converted.width(), 3))
-                            .copy()
-                        )
+                        numpy_frame = self._store_qimage(qimg)
+                        if numpy_frame is None:
+                            image = qimg.convertToFormat(QImage.Format.Format_RGB888)
+                            numpy_frame = self._store_qimage(image)
             finally:
                 frame.unmap()
 
@@ -856,17 +1040,13 @@ class GrillaWidget(QWidget):
             image = frame.toImage()
             if image.isNull():
                 return
-            img_converted = image.convertToFormat(QImage.Format.Format_RGB888)
-            ptr = img_converted.constBits()
-            ptr.setsize(img_converted.width() * img_converted.height() * 3)
-            numpy_frame = (
-                np.frombuffer(ptr, dtype=np.uint8)
-                .reshape((img_converted.height(), img_converted.width(), 3))
-                .copy()
-            )
+            numpy_frame = self._store_qimage(image)
+            if numpy_frame is None:
+                image = image.convertToFormat(QImage.Format.Format_RGB888)
+                numpy_frame = self._store_qimage(image)
 
-        current_frame_width = img_converted.width()
-        current_frame_height = img_converted.height()
+        current_frame_width = image.width()
+        current_frame_height = image.height()
         if (
             self.original_frame_size is None
             or self.original_frame_size.width() != current_frame_width
@@ -874,23 +1054,32 @@ class GrillaWidget(QWidget):
         ):
             self.original_frame_size = QSize(current_frame_width, current_frame_height)
 
+        # Vista del slot del buffer circular: válida hasta que el buffer dé la vuelta
         self.last_frame = numpy_frame
-        self.frame_buffer.append(numpy_frame)
         
         # Procesar videos pendientes
-        for rec in list(self.pending_videos):
+        # En orden inverso para poder quitar con pop(i) sin copiar la lista en cada frame
+        for i in range(len(self.pending_videos) - 1, -1, -1):
+            rec = self.pending_videos[i]
             if rec["frames_left"] > 0:
-                rec["frames"].append(numpy_frame)
                 rec["frames_left"] -= 1
             if rec["frames_left"] <= 0:
-                thread = VideoSaverThread(rec["frames"], rec["path"], fps=10)
+                # Frames posteriores al cruce, copiados del buffer a continuación de los previos
+                frames, count = rec["frames"], rec["count"]
+                if rec["buffer"] is self.frame_buffer:
+                    count += len(self._buffered_frames_since(rec["start"], out=frames[count:]))
+                    frames = frames[:count]
+                else:
+                    # El tamaño del frame cambió: lista mixta, VideoSaverThread redimensiona
+                    frames = list(frames[:count]) + list(self._buffered_frames_since(0))
+                thread = VideoSaverThread(frames, rec["path"], fps=10)
                 thread.finished.connect(lambda r=thread: self._remove_video_thread(r))
                 self.active_video_threads.append(thread)
                 thread.start()
-                self.pending_videos.remove(rec)
+                self.pending_videos.pop(i)
                 self.registrar_log(f"🎥 Video guardado: {os.path.basename(rec['path'])}")
 
-        self.pixmap = QPixmap.fromImage(img_converted)
+        self.pixmap = QPixmap.fromImage(image)
         self.request_paint_update()
 
     def registrar_log(self, mensaje):
@@ -898,8 +1087,7 @@ class GrillaWidget(QWidget):
         ip = self.cam_data.get("ip", "IP-desconocida") if self.cam_data else "IP-indefinida"
         mensaje_completo = f"[{fecha_hora}] Cámara {ip}: {mensaje}"
         self.log_signal.emit(mensaje_completo)
-        with open("eventos_detectados.txt", "a", encoding="utf-8") as f:
-            f.write(mensaje_completo + "\n")
+        get_line_writer(EVENT_LOG_PATH).write(mensaje_completo + "\n")
 
     def _remove_video_thread(self, thread):
         if thread in self.active_video_threads:
@@ -932,6 +1120,9 @@ class GrillaWidget(QWidget):
         for th in list(self.active_video_threads):
             if th.isRunning():
                 th.wait(1000)
+        self._flush_config()
+        # El escritor es compartido entre widgets: solo esperar a que se escriba lo pendiente
+        get_line_writer(EVENT_LOG_PATH).flush()
 
     def mousePressEvent(self, event):
         if self.cross_line_edit_mode:
@@ -961,14 +1152,11 @@ class GrillaWidget(QWidget):
             return
         
         pos = event.position()
-        cell_w = self.width() / self.columnas
-        cell_h = self.height() / self.filas
-
-        if cell_w == 0 or cell_h == 0:
+        if not self._cell_w or not self._cell_h:
             return
 
-        col = int(pos.x() / cell_w)
-        row = int(pos.y() / cell_h)
+        col = int(pos.x() * self._inv_cell_w)
+        row = int(pos.y() * self._inv_cell_h)
 
         if not (0 <= row < self.filas and 0 <= col < self.columnas):
             return
@@ -1087,12 +1275,38 @@ class GrillaWidget(QWidget):
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Error abriendo configuración: {e}")
 
+    def _rebuild_cell_grids(self):
+        """Volcar cell_presets, cell_ptz_map y discarded_cells en matrices (filas, columnas) indexadas por celda"""
+        self._discarded_mask = np.zeros((self.filas, self.columnas), dtype=bool)
+        for row, col in self.discarded_cells:
+            if 0 <= row < self.filas and 0 <= col < self.columnas:
+                self._discarded_mask[row, col] = True
+        self._preset_grid = np.full((self.filas, self.columnas), None, dtype=object)
+        self._ptz_grid = np.full((self.filas, self.columnas), None, dtype=object)
+        for grid, cells in ((self._preset_grid, self.cell_presets), (self._ptz_grid, self.cell_ptz_map)):
+            for (row, col), value in cells.items():
+                if 0 <= row < self.filas and 0 <= col < self.columnas:
+                    grid[row, col] = value
+
+        # Índice por celda en _ptz_targets (-1 = sin PTZ válido) para filtrar sin tocar dicts
+        self._ptz_idx = np.full((self.filas, self.columnas), -1, dtype=np.int32)
+        self._ptz_targets = []
+        for (row, col), mapping in np.ndenumerate(self._ptz_grid):
+            if mapping is None:
+                continue
+            ip_tgt = mapping.get("ip")
+            preset_tgt = mapping.get("preset")
+            if ip_tgt and preset_tgt is not None:
+                self._ptz_idx[row, col] = len(self._ptz_targets)
+                self._ptz_targets.append((ip_tgt, preset_tgt))
+
     def handle_discard_cells(self):
         if not self.selected_cells:
             return
 
         self.discarded_cells.update(self.selected_cells)
-        self._save_discarded_cells_to_config() 
+        self._rebuild_cell_grids()
+        self._mark_config_dirty("discarded_grid_cells")
         self.selected_cells.clear()
         self.request_paint_update()
 
@@ -1108,9 +1322,10 @@ class GrillaWidget(QWidget):
 
         for cell in cells_to_enable:
             self.discarded_cells.remove(cell)
+        self._rebuild_cell_grids()
         
         self.registrar_log(f"Celdas habilitadas: {len(cells_to_enable)}")
-        self._save_discarded_cells_to_config()
+        self._mark_config_dirty("discarded_grid_cells")
         self.selected_cells.clear()
         self.request_paint_update()
 
@@ -1126,7 +1341,8 @@ class GrillaWidget(QWidget):
         for cell in self.selected_cells:
             self.cell_presets[cell] = str(preset)
 
-        self._save_cell_presets_to_config()
+        self._rebuild_cell_grids()
+        self._mark_config_dirty("cell_presets")
         self.request_paint_update()
 
     def handle_clear_preset(self):
@@ -1137,7 +1353,8 @@ class GrillaWidget(QWidget):
             if cell in self.cell_presets:
                 del self.cell_presets[cell]
 
-        self._save_cell_presets_to_config()
+        self._rebuild_cell_grids()
+        self._mark_config_dirty("cell_presets")
         self.request_paint_update()
 
     def handle_set_ptz_map(self):
@@ -1259,7 +1476,8 @@ class GrillaWidget(QWidget):
         for cell in self.selected_cells:
             self.cell_ptz_map[cell] = {"ip": ip, "preset": str(preset)}
 
-        self._save_cell_ptz_map_to_config()
+        self._rebuild_cell_grids()
+        self._mark_config_dirty("cell_ptz_map")
         self.selected_cells.clear()
         self.request_paint_update()
         
@@ -1278,8 +1496,7 @@ class GrillaWidget(QWidget):
         self.ptz_cameras = []
         
         try:
-            with open(CONFIG_FILE_PATH, 'r') as f:
-                config_data = json.load(f)
+            config_data = _load_config()
             
             camaras_config = config_data.get("camaras", [])
             for cam_config in camaras_config:
@@ -1369,7 +1586,8 @@ class GrillaWidget(QWidget):
                 removed_count += 1
 
         if removed_count > 0:
-            self._save_cell_ptz_map_to_config()
+            self._rebuild_cell_grids()
+            self._mark_config_dirty("cell_ptz_map")
             self.request_paint_update()
             
             self.registrar_log(f"🗑️ PTZ eliminado de {removed_count} celdas:")
@@ -1429,13 +1647,35 @@ class GrillaWidget(QWidget):
         else:
             super().mouseReleaseEvent(event)
 
-    def _save_discarded_cells_to_config(self):
+    def _mark_config_dirty(self, section):
+        """Marcar una sección de la cámara actual para guardarla en config.json tras CONFIG_SAVE_DELAY_MS"""
+        self._dirty_config_sections.add(section)
+        self._config_timer.start()
+
+    def _config_section_value(self, section):
+        """Valor serializable en JSON de una sección de configuración de celdas"""
+        if section == "discarded_grid_cells":
+            return sorted([list(cell) for cell in self.discarded_cells])
+        if section == "cell_presets":
+            return {f"{row}_{col}": preset for (row, col), preset in self.cell_presets.items()}
+        return {
+            f"{row}_{col}": {"ip": data.get("ip"), "preset": str(data.get("preset", ""))}
+            for (row, col), data in self.cell_ptz_map.items()
+        }
+
+    def _flush_config(self):
+        """Escribir en config.json, con una sola lectura y escritura, las secciones pendientes"""
+        self._config_timer.stop()
+        sections = self._dirty_config_sections
+        if not sections:
+            return
+        self._dirty_config_sections = set()
+
         if not self.cam_data or not self.cam_data.get("ip"):
             self.registrar_log("Error: No se pudo obtener la IP de la cámara")
             return
 
         current_cam_ip = self.cam_data.get("ip")
-        discarded_list_for_json = sorted([list(cell) for cell in self.discarded_cells])
 
         config_data = None
         try:
@@ -1450,20 +1690,21 @@ class GrillaWidget(QWidget):
             self.registrar_log(f"Error leyendo configuración: {e}")
             return
 
-        camara_encontrada = False
         if "camaras" not in config_data:
             config_data["camaras"] = []
 
+        cam_entry = None
         for cam_config in config_data["camaras"]:
             if cam_config.get("ip") == current_cam_ip:
-                cam_config["discarded_grid_cells"] = discarded_list_for_json
-                camara_encontrada = True
+                cam_entry = cam_config
                 break
         
-        if not camara_encontrada:
-            new_cam_entry = self.cam_data.copy() 
-            new_cam_entry["discarded_grid_cells"] = discarded_list_for_json
-            config_data["camaras"].append(new_cam_entry)
+        if cam_entry is None:
+            cam_entry = self.cam_data.copy() 
+            config_data["camaras"].append(cam_entry)
+
+        for section in sections:
+            cam_entry[section] = self._config_section_value(section)
 
         try:
             with open(CONFIG_FILE_PATH, 'w') as f:
@@ -1472,81 +1713,6 @@ class GrillaWidget(QWidget):
         except Exception as e:
             self.registrar_log(f"Error guardando configuración: {e}")
 
-    def _save_cell_presets_to_config(self):
-        if not self.cam_data or not self.cam_data.get("ip"):
-            return
-
-        current_cam_ip = self.cam_data.get("ip")
-        presets_for_json = {f"{row}_{col}": preset for (row, col), preset in self.cell_presets.items()}
-
-        try:
-            with open(CONFIG_FILE_PATH, 'r') as f:
-                config_data = json.load(f)
-        except FileNotFoundError:
-            config_data = {"camaras": [], "configuracion": {}}
-        except Exception:
-            return
-
-        if "camaras" not in config_data:
-            config_data["camaras"] = []
-
-        camera_found = False
-        for cam_config in config_data["camaras"]:
-            if cam_config.get("ip") == current_cam_ip:
-                cam_config["cell_presets"] = presets_for_json
-                camera_found = True
-                break
-
-        if not camera_found:
-            new_cam_entry = self.cam_data.copy()
-            new_cam_entry["cell_presets"] = presets_for_json
-            config_data["camaras"].append(new_cam_entry)
-
-        try:
-            with open(CONFIG_FILE_PATH, 'w') as f:
-                json.dump(config_data, f, indent=4)
-        except Exception:
-            pass
-
-    def _save_cell_ptz_map_to_config(self):
-        if not self.cam_data or not self.cam_data.get("ip"):
-            return
-
-        current_cam_ip = self.cam_data.get("ip")
-        map_for_json = {
-            f"{row}_{col}": {"ip": data.get("ip"), "preset": str(data.get("preset", ""))}
-            for (row, col), data in self.cell_ptz_map.items()
-        }
-
-        try:
-            with open(CONFIG_FILE_PATH, 'r') as f:
-                config_data = json.load(f)
-        except FileNotFoundError:
-            config_data = {"camaras": [], "configuracion": {}}
-        except Exception:
-            return
-
-        if "camaras" not in config_data:
-            config_data["camaras"] = []
-
-        found = False
-        for cam_config in config_data["camaras"]:
-            if cam_config.get("ip") == current_cam_ip:
-                cam_config["cell_ptz_map"] = map_for_json
-                found = True
-                break
-
-        if not found:
-            new_cam_entry = self.cam_data.copy()
-            new_cam_entry["cell_ptz_map"] = map_for_json
-            config_data["camaras"].append(new_cam_entry)
-
-        try:
-            with open(CONFIG_FILE_PATH, 'w') as f:
-                json.dump(config_data, f, indent=4)
-        except Exception:
-            pass
-
     def _get_camera_credentials(self, ip):
         """CORREGIDO: Busca credenciales para cualquier IP, PTZ o fija"""
         # Primero intentar desde el caché
@@ -1557,8 +1723,7 @@ class GrillaWidget(QWidget):
             
         # Si no está en caché, buscar en config.json
         try:
-            with open(CONFIG_FILE_PATH, 'r') as f:
-                data = json.load(f)
+            data = _load_config()
             for cam in data.get("camaras", []):
                 if cam.get("ip") == ip:
                     cred = {
@@ -1606,8 +1771,8 @@ class GrillaWidget(QWidget):
         qp = QPainter(self)
         
         if not self.pixmap or self.pixmap.isNull():
-            qp.fillRect(self.rect(), QColor("black"))
-            qp.setPen(QColor("white"))
+            qp.fillRect(self.rect(), self._black_color)
+            qp.setPen(self._white_color)
             qp.drawText(self.rect(), Qt.AlignmentFlag.AlignCenter, "Sin señal")
             return
 
@@ -1627,48 +1792,52 @@ class GrillaWidget(QWidget):
         qp.drawPixmap(video_rect, self.pixmap, QRectF(self.pixmap.rect()))
 
         # Dibujar la grilla de celdas
-        cell_w = self.width() / self.columnas
-        cell_h = self.height() / self.filas
+        cell_w = self._cell_w
+        cell_h = self._cell_h
+        
+        # Filas de las matrices por celda como listas: indexado rápido en el doble bucle
+        discarded_rows = self._discarded_mask.tolist()
+        preset_rows = self._preset_grid.tolist()
+        ptz_rows = self._ptz_grid.tolist()
         
         for row in range(self.filas):
             for col in range(self.columnas):
                 index = row * self.columnas + col
                 estado_area = self.area[index] if index < len(self.area) else 0
                 cell_tuple = (row, col)
+                preset = preset_rows[row][col]
+                ptz_info = ptz_rows[row][col]
                 brush_color = None
 
-                if cell_tuple in self.discarded_cells:
-                    brush_color = QColor(200, 0, 0, 150)
-                elif cell_tuple in self.cell_presets:
-                    brush_color = QColor(0, 0, 255, 80)
-                elif cell_tuple in self.cell_ptz_map:
-                    brush_color = QColor(128, 0, 128, 80)
+                if discarded_rows[row][col]:
+                    brush_color = self._cell_discarded_color
+                elif preset is not None:
+                    brush_color = self._cell_preset_color
+                elif ptz_info is not None:
+                    brush_color = self._cell_ptz_color
                 elif cell_tuple in self.selected_cells:
-                    brush_color = QColor(255, 0, 0, 100)
+                    brush_color = self._cell_selected_color
                 elif index in self.temporal:
-                    brush_color = QColor(0, 255, 0, 100)
+                    brush_color = self._cell_temporal_color
                 elif estado_area == 1:
-                    brush_color = QColor(255, 165, 0, 100)
+                    brush_color = self._cell_area_color
 
                 if brush_color is not None:
                     rect_to_draw = QRectF(col * cell_w, row * cell_h, cell_w, cell_h)
                     qp.fillRect(rect_to_draw, brush_color)
                 
                 # Mostrar preset local (P + número)
-                if (row, col) in self.cell_presets:
-                    qp.setPen(QColor("white"))
-                    preset_text = f"P{self.cell_presets[(row, col)]}"
+                if preset is not None:
+                    qp.setPen(self._white_color)
+                    preset_text = f"P{preset}"
                     qp.drawText(QPointF(col * cell_w + 2, row * cell_h + 12), preset_text)
                 
                 # Mostrar preset PTZ remoto (número del preset)
-                if (row, col) in self.cell_ptz_map:
-                    ptz_info = self.cell_ptz_map[(row, col)]
+                if ptz_info is not None:
                     preset_num = ptz_info.get("preset", "?")
                     
-                    qp.setPen(QColor("yellow"))
-                    font = qp.font()
-                    font.setPointSize(8)
-                    qp.setFont(font)
+                    qp.setPen(self._yellow_color)
+                    qp.setFont(self._ptz_preset_font)
                     
                     preset_text = str(preset_num)
                     text_rect = qp.fontMetrics().boundingRect(preset_text)
@@ -1680,8 +1849,7 @@ class GrillaWidget(QWidget):
                     )
                     
                     # Restaurar fuente original
-                    font.setPointSize(10)
-                    qp.setFont(font)
+                    qp.setFont(self._cell_font)
 
         # Dibujar líneas de la grilla
         if self._grid_lines_pixmap:
@@ -1698,10 +1866,8 @@ class GrillaWidget(QWidget):
                 info_text += f" | Act: {activity_score:.2f}"
             
             # Fondo semi-transparente
-            qp.setPen(QColor("white"))
-            font = qp.font()
-            font.setPointSize(9)
-            qp.setFont(font)
+            qp.setPen(self._white_color)
+            qp.setFont(self._info_font)
             
             text_rect = qp.fontMetrics().boundingRect(info_text)
             bg_rect = QRectF(
@@ -1711,7 +1877,7 @@ class GrillaWidget(QWidget):
                 text_rect.height() + 4
             )
             
-            qp.fillRect(bg_rect, QColor(0, 0, 0, 180))
+            qp.fillRect(bg_rect, self._info_bg_color)
             
             # Dibujar texto
             qp.drawText(
@@ -1722,10 +1888,8 @@ class GrillaWidget(QWidget):
             # Mostrar información de muestreo fijo
             info_text = f"📊 Fijo: {self.fixed_detection_interval}"
             
-            qp.setPen(QColor("lightgray"))
-            font = qp.font()
-            font.setPointSize(9)
-            qp.setFont(font)
+            qp.setPen(self._lightgray_color)
+            qp.setFont(self._info_font)
             
             text_rect = qp.fontMetrics().boundingRect(info_text)
             bg_rect = QRectF(
@@ -1735,7 +1899,7 @@ class GrillaWidget(QWidget):
                 text_rect.height() + 4
             )
             
-            qp.fillRect(bg_rect, QColor(0, 0, 0, 180))
+            qp.fillRect(bg_rect, self._info_bg_color)
             qp.drawText(
                 QPointF(self.width() - text_rect.width() - 7, text_rect.height() + 7),
                 info_text
@@ -1755,9 +1919,7 @@ class GrillaWidget(QWidget):
             offset_x = video_rect.left()
             offset_y = video_rect.top()
             
-            font = QFont()
-            font.setPointSize(10)
-            qp.setFont(font)
+            qp.setFont(self._box_font)
 
             for box_data in self.latest_tracked_boxes:
                 if not isinstance(box_data, dict):
@@ -1789,17 +1951,14 @@ class GrillaWidget(QWidget):
                 
                 # MEJORA: Colores dinámicos según confianza
                 if conf_val >= 0.70:
-                    box_color = QColor("lime")      # Verde brillante para alta confianza
+                    box_pen = self._box_pens[0]     # Verde brillante para alta confianza
                 elif conf_val >= 0.50:
-                    box_color = QColor("yellow")    # Amarillo para confianza media
+                    box_pen = self._box_pens[1]     # Amarillo para confianza media
                 else:
-                    box_color = QColor("orange")    # Naranja para confianza baja
+                    box_pen = self._box_pens[2]     # Naranja para confianza baja
                 
                 # Dibujar el rectángulo de detección
-                pen = QPen()
-                pen.setWidth(3)
-                pen.setColor(box_color)
-                qp.setPen(pen)
+                qp.setPen(box_pen)
                 qp.setBrush(Qt.BrushStyle.NoBrush)
                 qp.drawRect(QRectF(scaled_x1, scaled_y1, scaled_w, scaled_h))
                 
@@ -1835,10 +1994,10 @@ class GrillaWidget(QWidget):
                     text_bg_rect.moveTop(scaled_y2 + 2)
                 
                 # Fondo con transparencia
-                qp.fillRect(text_bg_rect, QColor(0, 0, 0, 200))
+                qp.fillRect(text_bg_rect, self._label_bg_color)
                 
                 # Dibujar el texto
-                qp.setPen(QColor("white"))
+                qp.setPen(self._white_color)
                 text_x = text_bg_rect.left() + 4
                 text_y = text_bg_rect.bottom() - 4
                 qp.drawText(QPointF(text_x, text_y), label_text)
@@ -1848,19 +2007,15 @@ class GrillaWidget(QWidget):
             x1_rel, y1_rel = self.cross_counter.line[0]
             x2_rel, y2_rel = self.cross_counter.line[1]
             
-            pen = QPen(QColor('yellow'))
-            pen.setWidth(3)
-            qp.setPen(pen)
+            qp.setPen(self._cross_line_pen)
             qp.drawLine(
                 QPointF(x1_rel * self.width(), y1_rel * self.height()),
                 QPointF(x2_rel * self.width(), y2_rel * self.height()),
             )
             
             if self.cross_line_edit_mode:
-                handle_pen = QPen(QColor('red'))
-                handle_pen.setWidth(4)
-                qp.setPen(handle_pen)
-                qp.setBrush(QBrush(QColor('red')))
+                qp.setPen(self._handle_pen)
+                qp.setBrush(self._handle_brush)
                 size = 6
                 qp.drawEllipse(QPointF(x1_rel * self.width(), y1_rel * self.height()), size, size)
                 qp.drawEllipse(QPointF(x2_rel * self.width(), y2_rel * self.height()), size, size)
@@ -1875,7 +2030,7 @@ class GrillaWidget(QWidget):
             
             counts_text = " | ".join(counts_parts)
             if counts_text:
-                qp.setPen(QColor('yellow'))
+                qp.setPen(self._yellow_color)
                 qp.drawText(QPointF(x2_rel * self.width() + 5, y2_rel * self.height()), counts_text)
 
     def save_adaptive_config_to_file(self, filename=None):
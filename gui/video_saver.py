@@ -3,6 +3,9 @@ import cv2
 import os
 
 class VideoSaverThread(QThread):
+    # Directorios ya creados en este proceso: makedirs una sola vez por día de capturas
+    _created_dirs = set()
+
     def __init__(self, frames, output_path, fps=10, parent=None):
         super().__init__(parent)
         self.frames = frames
@@ -10,8 +13,13 @@ class VideoSaverThread(QThread):
         self.fps = fps
 
     def run(self):
-        if not self.frames:
+        # frames puede ser una lista o un array (N, alto, ancho, 3)
+        if len(self.frames) == 0:
             return
+        ruta = os.path.dirname(self.output_path)
+        if ruta and ruta not in self._created_dirs:
+            os.makedirs(ruta, exist_ok=True)
+            self._created_dirs.add(ruta)
         h, w = self.frames[0].shape[:2]
         fourcc = cv2.VideoWriter_fourcc(*"mp4v")
         writer = cv2.VideoWriter(self.output_path, fourcc, self.fps, (w, h))
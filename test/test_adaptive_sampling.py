@@ -0,0 +1,47 @@
+import sys
+import unittest
+import os
+import dataclasses
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from core.adaptive_sampling import AdaptiveSamplingConfig, AdaptiveSamplingController
+
+def _controller():
+    config = dataclasses.replace(AdaptiveSamplingConfig.create_config("balanced"), enable_burst_mode=False)
+    controller = AdaptiveSamplingController(config)
+    controller.enable()
+    return controller
+
+class UpdateActivityTest(unittest.TestCase):
+    def test_smoothing_advances_once_per_elapsed_frame(self):
+        per_frame = _controller()
+        for _ in range(4):
+            per_frame.should_process_frame()
+
+        per_window = _controller()
+        interval = per_window.update_activity(frames=4)
+
+        self.assertEqual(interval, per_frame.get_current_interval())
+        self.assertEqual(per_window.get_current_interval(), per_frame.get_current_interval())
+
+    def test_skipped_frames_are_counted(self):
+        controller = _controller()
+        controller.update_activity()
+        controller.update_activity(frames=5)
+        controller.update_activity(frames=3)
+
+        status = controller.get_status()
+        self.assertEqual(status['frames_processed'], 9)
+        self.assertEqual(status['frames_analyzed'], 3)
+        self.assertEqual(status['frames_skipped'], 6)
+
+    def test_interval_change_callback(self):
+        controller = _controller()
+        changes = []
+        controller.on_interval_change = changes.append
+        interval = controller.update_activity(frames=2)
+        self.assertEqual(changes, [interval])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import sys
+import unittest
+import os
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from core.box_records import boxes_to_records, box_centers, alert_tuples
+
+class BoxRecordsTest(unittest.TestCase):
+    def test_non_numeric_ids_and_classes(self):
+        boxes = [
+            {'bbox': (0, 0, 10, 10), 'cls': None, 'conf': 0.9, 'id': None},
+            {'bbox': (0, 0, 10, 10), 'cls': 2, 'conf': None, 'id': 'abc'},
+            {'bbox': (0, 0, 10, 10), 'cls': 'x', 'id': '7'},
+            {'bbox': (0, 0, 10, 10), 'cls': 8.0, 'conf': 0.5, 'id': 3.5},
+        ]
+        arr = boxes_to_records(boxes)
+        self.assertEqual(arr['cls'].tolist(), [-1, 2, -1, 8])
+        self.assertEqual(arr['conf'].tolist(), [0.9, 0.0, 0.0, 0.5])
+
+        rows = np.arange(len(boxes))
+        tuples = alert_tuples(boxes, rows, box_centers(arr['bbox']))
+        self.assertEqual([t[7] for t in tuples], [None, 'abc', '7', 3.5])
+        self.assertEqual([t[4] for t in tuples], [None, 2, 'x', 8.0])
+
+    def test_float_bboxes_are_not_truncated(self):
+        boxes = [
+            {'bbox': (0.6, 1.4, 1.6, 2.8), 'cls': 0, 'conf': 0.8, 'id': 1},
+            {'bbox': (10, 20, 31, 41), 'cls': 0, 'conf': 0.8, 'id': 2},
+        ]
+        arr = boxes_to_records(boxes)
+        centers = box_centers(arr['bbox'])
+        expected = [[int((x1 + x2) / 2), int((y1 + y2) / 2)]
+                    for x1, y1, x2, y2 in (b['bbox'] for b in boxes)]
+        self.assertEqual(centers.tolist(), expected)
+        self.assertEqual(arr['bbox'][0].tolist(), [0.6, 1.4, 1.6, 2.8])
+
+        tuples = alert_tuples(boxes, np.array([1]), centers)
+        self.assertEqual(tuples, [(10, 20, 31, 41, 0, 20, 30, 2, 0.8)])
+
+    def test_empty_input(self):
+        arr = boxes_to_records([])
+        self.assertEqual(arr.shape, (0,))
+        self.assertEqual(box_centers(arr['bbox']).shape, (0, 2))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,29 @@
+import sys
+import unittest
+import os
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from core.frame_numba import copy_rows, _copy_rows_kernel
+
+class CopyRowsTest(unittest.TestCase):
+    def test_padded_lines_are_skipped(self):
+        # 2x3 RGB888 con líneas alineadas a 12 bytes (3 de relleno por fila)
+        frame = np.arange(2 * 3 * 3, dtype=np.uint8).reshape(2, 3, 3)
+        src = np.zeros(2 * 12, dtype=np.uint8)
+        src[0:9] = frame[0].ravel()
+        src[12:21] = frame[1].ravel()
+        dst = np.empty((2, 3, 3), dtype=np.uint8)
+        copy_rows(src, dst, 12)
+        np.testing.assert_array_equal(dst, frame)
+
+    def test_kernel_matches_numpy_path(self):
+        src = np.arange(3 * 8, dtype=np.uint8)
+        dst = np.empty((3, 6), dtype=np.uint8)
+        _copy_rows_kernel(src, dst, 8)
+        np.testing.assert_array_equal(dst, src.reshape(3, 8)[:, :6])
+
+if __name__ == '__main__':
+    unittest.main()
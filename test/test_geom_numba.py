@@ -0,0 +1,26 @@
+import sys
+import unittest
+import os
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from core.geom_numba import point_seg_dist, sides
+
+class PointSegmentDistanceTest(unittest.TestCase):
+    def test_projection_inside_and_beyond_segment(self):
+        self.assertAlmostEqual(point_seg_dist(5.0, 3.0, 0.0, 0.0, 10.0, 0.0), 3.0)
+        self.assertAlmostEqual(point_seg_dist(13.0, 4.0, 0.0, 0.0, 10.0, 0.0), 5.0)
+
+    def test_degenerate_segment_uses_manhattan_length(self):
+        self.assertAlmostEqual(point_seg_dist(3.0, 4.0, 0.0, 0.0, 0.0, 0.0), 7.0)
+
+class SidesTest(unittest.TestCase):
+    def test_points_on_each_side_of_vertical_line(self):
+        cx = np.array([0.0, 20.0, 10.0])
+        cy = np.array([5.0, 5.0, 5.0])
+        self.assertEqual(sides(cx, cy, 10.0, 0.0, 10.0, 10.0).tolist(), [-1, 1, 1])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,57 @@
+import sys
+import unittest
+import os
+import tempfile
+import contextlib
+import io
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+from core.log_writer import AsyncLineWriter
+
+class AsyncLineWriterTest(unittest.TestCase):
+    def test_lines_are_appended_in_order(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "eventos.txt")
+            with open(path, "w", encoding="utf-8") as f:
+                f.write("previa\n")
+            writer = AsyncLineWriter(path, batch_size=4)
+            for i in range(10):
+                writer.write(f"linea {i}\n")
+            writer.flush()
+            with open(path, encoding="utf-8") as f:
+                lines = f.read().splitlines()
+            writer.close()
+            self.assertEqual(lines, ["previa"] + [f"linea {i}" for i in range(10)])
+
+    def test_close_writes_pending_lines(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "eventos.txt")
+            writer = AsyncLineWriter(path)
+            writer.write("ultima\n")
+            writer.close()
+            with open(path, encoding="utf-8") as f:
+                self.assertEqual(f.read(), "ultima\n")
+
+    def test_open_failure_does_not_queue_lines(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "falta", "eventos.txt")
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                writer = AsyncLineWriter(path)
+                writer._thread.join(2.0)
+                for i in range(5):
+                    writer.write(f"linea {i}\n")
+                writer.flush()
+            self.assertFalse(writer._thread.is_alive())
+            self.assertEqual(writer._queue.qsize(), 0)
+            self.assertEqual(output.getvalue().count("Error escribiendo log"), 1)
+
+            # Si el archivo vuelve a poder abrirse, las líneas se escriben directamente
+            os.mkdir(os.path.dirname(path))
+            writer.write("directa\n")
+            with open(path, encoding="utf-8") as f:
+                self.assertEqual(f.read(), "directa\n")
+
+if __name__ == '__main__':
+    unittest.main()
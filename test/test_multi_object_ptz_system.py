@@ -0,0 +1,242 @@
+import sys
+import types
+import pickle
+import unittest
+import os
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(__file__)))
+
+# Stub onvif module used by the PTZ tracker
+class DummyPTZService:
+    def __init__(self):
+        self.calls = []
+    def create_type(self, name):
+        return types.SimpleNamespace()
+    def __getattr__(self, name):
+        def call(request):
+            self.calls.append((name, request))
+        return call
+
+class DummyMediaService:
+    def GetProfiles(self):
+        return [types.SimpleNamespace(token='profile_1')]
+
+class DummyONVIFCamera:
+    def __init__(self, *args, **kwargs):
+        pass
+    def create_media_service(self):
+        return DummyMediaService()
+    def create_ptz_service(self):
+        return DummyPTZService()
+
+onvif_mod = types.ModuleType('onvif')
+onvif_mod.ONVIFCamera = DummyONVIFCamera
+sys.modules['onvif'] = onvif_mod
+
+from core import multi_object_ptz_system
+from core.multi_object_ptz_system import (
+    MultiObjectPTZTracker, MultiObjectConfig, TrackedObject, ObjectPosition
+)
+
+def make_detection(cx, cy, size=0.1, conf=0.9):
+    return {'cx': cx, 'cy': cy, 'width': size, 'height': size, 'confidence': conf}
+
+class MultiObjectPriorityTest(unittest.TestCase):
+    def test_centered_confident_object_has_highest_priority(self):
+        tracker = MultiObjectPTZTracker('127.0.0.1', 80, 'user', 'pass')
+        tracker.update_detections([
+            make_detection(0.5, 0.5, conf=0.95),
+            make_detection(0.1, 0.1, conf=0.6),
+        ])
+        tracker._update_object_priorities()
+        centered, corner = tracker.tracked_objects[1], tracker.tracked_objects[2]
+        self.assertGreater(centered.priority_score, corner.priority_score)
+
+    def test_lost_object_releases_slot(self):
+        tracker = MultiObjectPTZTracker('127.0.0.1', 80, 'user', 'pass',
+                                        multi_config=MultiObjectConfig(max_objects_to_track=1))
+        tracker.update_detections([make_detection(0.5, 0.5)])
+        tracker._handle_lost_objects(tracker.tracked_objects[1].last_seen + 10.0)
+        self.assertEqual(tracker.tracked_objects, {})
+        tracker.update_detections([make_detection(0.2, 0.2)])
+        self.assertIn(2, tracker.tracked_objects)
+
+    def test_only_stale_objects_are_lost(self):
+        tracker = MultiObjectPTZTracker('127.0.0.1', 80, 'user', 'pass')
+        tracker.update_detections([make_detection(0.2, 0.2), make_detection(0.8, 0.8)])
+        stale = tracker.tracked_objects[1]
+        stale.last_seen -= 10.0
+        tracker._last_seen_arr[stale.slot] = stale.last_seen
+        lost = []
+        tracker.on_object_lost = lost.append
+        tracker._handle_lost_objects(tracker.tracked_objects[2].last_seen)
+        self.assertEqual(lost, [1])
+        self.assertEqual(list(tracker.tracked_objects), [2])
+
+class MultiObjectFilterTest(unittest.TestCase):
+    def test_low_confidence_and_out_of_range_sizes_are_rejected(self):
+        tracker = MultiObjectPTZTracker('127.0.0.1', 80, 'user', 'pass')
+        tracker.update_detections([
+            make_detection(0.2, 0.2, conf=0.4),
+            make_detection(0.4, 0.4, size=0.05),
+            make_detection(0.6, 0.6, size=0.95),
+            make_detection(0.8, 0.8, conf=0.5),
+        ])
+        self.assertEqual(len(tracker.tracked_objects), 1)
+        self.assertAlmostEqual(tracker.tracked_objects[1].get_current_position().cx, 0.8)
+
+    def test_array_ingest_matches_dict_updates(self):
+        detections = [
+            make_detection(0.2, 0.2, conf=0.4),
+            make_detection(0.4, 0.4, size=0.05),
+            make_detection(0.8, 0.8, conf=0.5),
+        ]
+        tracker = MultiObjectPTZTracker('127.0.0.1', 80, 'user', 'pass')
+        tracker.ingest_detections(np.array([[d['cx'], d['cy'], d['width'], d['height'], d['confidence']]
+                                            for d in detections], dtype=np.float32))
+        self.assertEqual(list(tracker.tracked_objects), [1])
+        self.assertAlmostEqual(tracker.tracked_objects[1].get_current_position().cx, 0.8, places=6)
+        self.assertEqual(tracker.total_detections_processed, 3)
+
+class MultiObjectAssociationTest(unittest.TestCase):
+    def test_detections_follow_nearest_track(self):
+        tracker = MultiObjectPTZTracker('127.0.0.1', 80, 'user', 'pass')
+        tracker.update_detections([make_detection(0.3, 0.3), make_detection(0.7, 0.7)])
+        tracker.update_detections([make_detection(0.72, 0.71), make_detection(0.31, 0.29)])
+        self.assertEqual(len(tracker.tracked_objects), 2)
+        self.assertAlmostEqual(tracker.tracked_objects[1].get_current_position().cx, 0.31)
+        self.assertAlmostEqual(tracker.tracked_objects[2].get_current_position().cx, 0.72)
+
+    def test_far_detection_creates_new_track(self):
+        tracker = MultiObjectPTZTracker('127.0.0.1', 80, 'user', 'pass')
+        tracker.update_detections([make_detection(0.3, 0.3)])
+        tracker.update_detections([make_detection(0.5, 0.3)])
+        self.assertEqual(sorted(tracker.tracked_objects), [1, 2])
+
+    @unittest.skipIf(multi_object_ptz_system.linear_sum_assignment is None, 'scipy no disponible')
+    def test_assignment_minimizes_total_cost(self):
+        # La pista 0 tomaría voraz la detección 0 y dejaría a la pista 1 fuera de la puerta
+        cost = np.array([[0.01, 0.02], [0.03, multi_object_ptz_system.ASSOCIATION_GATE_COST]])
+        self.assertEqual(multi_object_ptz_system._assign(cost), ([0, 1], [1, 0]))
+
+    def test_assignment_skips_detections_outside_every_gate(self):
+        gate = multi_object_ptz_system.ASSOCIATION_GATE_COST
+        cost = np.array([[gate, 0.02, gate, gate], [gate, gate, gate, 0.01]])
+        self.assertEqual(multi_object_ptz_system._assign(cost), ([0, 1], [1, 3]))
+        self.assertEqual(multi_object_ptz_system._assign(np.full((2, 3), gate)), ([], []))
+
+class TrackedObjectKalmanTest(unittest.TestCase):
+    def test_constant_velocity_is_estimated_and_predicted(self):
+        obj = TrackedObject(id=1)
+        for i in range(30):
+            t = 100.0 + i * 0.033
+            obj.add_position(ObjectPosition(cx=0.2 + 0.1 * (t - 100.0), cy=0.5, width=0.1,
+                                            height=0.1, confidence=0.9, timestamp=t))
+        self.assertTrue(obj.is_moving)
+        self.assertAlmostEqual(obj.velocity_x, 0.1, places=3)
+        self.assertAlmostEqual(obj.velocity_y, 0.0, places=3)
+        predicted = obj.get_predicted_position(1.0)
+        self.assertAlmostEqual(predicted.cx, obj.get_current_position().cx + 0.1, places=3)
+
+    def test_slotted_object_round_trips_through_pickle(self):
+        obj = TrackedObject(id=7)
+        for i in range(5):
+            t = 100.0 + i * 0.1
+            obj.add_position(ObjectPosition(cx=0.2 + 0.01 * i, cy=0.5, width=0.1, height=0.1,
+                                            confidence=0.9, timestamp=t), t)
+        self.assertFalse(hasattr(obj, '__dict__'))
+        restored = pickle.loads(pickle.dumps(obj))
+        self.assertEqual(restored, obj)
+        self.assertEqual(restored.positions.maxlen, obj.positions.maxlen)
+        self.assertEqual(restored.kf_mean.tolist(), obj.kf_mean.tolist())
+
+class PTZMovementTest(unittest.TestCase):
+    def test_speeds_point_towards_target_and_respect_limits(self):
+        tracker = MultiObjectPTZTracker('127.0.0.1', 80, 'user', 'pass',
+                                        multi_config=MultiObjectConfig(adaptive_zoom=False))
+        pan, tilt = tracker._calculate_ptz_movement(
+            ObjectPosition(cx=1.0, cy=0.45, width=0.1, height=0.1, confidence=0.9))
+        self.assertAlmostEqual(pan, tracker.multi_config.max_pan_speed)
+        self.assertAlmostEqual(tilt, 0.1)
+
+    def test_small_speed_changes_are_coalesced_until_flush(self):
+        tracker = MultiObjectPTZTracker('127.0.0.1', 80, 'user', 'pass')
+        tracker._send_ptz_command(0.3, 0.1, 100.0)
+        tracker._send_ptz_command(0.305, 0.1, 100.033)
+        moves = [c for c in tracker.ptz_service.calls if c[0] == 'ContinuousMove']
+        self.assertEqual(len(moves), 1)
+        tracker._flush_ptz_command(tracker._last_send_ts + 1.0)
+        moves = [c for c in tracker.ptz_service.calls if c[0] == 'ContinuousMove']
+        self.assertEqual(len(moves), 2)
+        self.assertEqual(moves[-1][1].Velocity['PanTilt']['x'], 0.305)
+
+    def test_command_is_skipped_when_measurement_matches_prediction(self):
+        config = MultiObjectConfig(ptz_innovation_gate=0.05, ptz_command_epsilon=0.0)
+        tracker = MultiObjectPTZTracker('127.0.0.1', 80, 'user', 'pass', multi_config=config)
+        tracker.update_detections([make_detection(0.7, 0.5)])
+        tracker.current_target_id = 1
+        tracker._execute_tracking(100.0)
+        tracker.update_detections([make_detection(0.701, 0.5)])
+        tracker._execute_tracking(100.033)
+        moves = [c for c in tracker.ptz_service.calls if c[0] == 'ContinuousMove']
+        self.assertEqual(len(moves), 1)
+        self.assertEqual(tracker.successful_tracks, 2)
+
+    def test_losing_the_only_target_stops_the_camera(self):
+        tracker = MultiObjectPTZTracker('127.0.0.1', 80, 'user', 'pass')
+        tracker.update_detections([make_detection(0.7, 0.5)])
+        tracker.current_target_id = 1
+        tracker._execute_tracking(100.0)
+        tracker._handle_lost_objects(tracker.tracked_objects[1].last_seen + 10.0)
+        self.assertIsNone(tracker.current_target_id)
+        self.assertEqual(tracker.ptz_service.calls[-1][0], 'Stop')
+
+    def test_lost_object_keeps_its_state_when_slot_is_reused(self):
+        tracker = MultiObjectPTZTracker('127.0.0.1', 80, 'user', 'pass')
+        tracker.update_detections([make_detection(0.2, 0.3)])
+        lost = tracker.tracked_objects[1]
+        slot = lost.slot
+        tracker._handle_lost_objects(lost.last_seen + 10.0)
+        tracker.update_detections([make_detection(0.8, 0.7)])
+        self.assertEqual(tracker.tracked_objects[2].slot, slot)
+        self.assertAlmostEqual(lost.kf_mean[0], 0.2, places=5)
+        self.assertAlmostEqual(lost.ring[lost.ring_head - 1, 0], 0.2, places=5)
+        self.assertEqual(lost.slot, -1)
+
+    def test_goto_preset_reuses_prebuilt_request(self):
+        tracker = MultiObjectPTZTracker('127.0.0.1', 80, 'user', 'pass')
+        self.assertTrue(tracker.goto_preset_and_track(3, start_tracking=False))
+        self.assertTrue(tracker.goto_preset_and_track('7', start_tracking=False))
+        presets = [c[1] for c in tracker.ptz_service.calls if c[0] == 'GotoPreset']
+        self.assertEqual(len(presets), 2)
+        self.assertIs(presets[0], presets[1])
+        self.assertEqual(presets[1].ProfileToken, 'profile_1')
+        self.assertEqual(presets[1].PresetToken, '7')
+        self.assertFalse(tracker.tracking_active)
+
+class TrackingTickTest(unittest.TestCase):
+    def test_single_object_mode_follows_best_object(self):
+        tracker = MultiObjectPTZTracker('127.0.0.1', 80, 'user', 'pass',
+                                        multi_config=MultiObjectConfig(alternating_enabled=False))
+        tracker.update_detections([make_detection(0.8, 0.5, conf=0.6), make_detection(0.6, 0.5)])
+        tracker._update_object_priorities()
+        tracker._tick(100.0)
+        self.assertEqual(tracker.current_target_id, 2)
+        moves = [c for c in tracker.ptz_service.calls if c[0] == 'ContinuousMove']
+        self.assertEqual(len(moves), 1)
+
+class AutoZoomTest(unittest.TestCase):
+    def test_zoom_commands_are_rate_limited(self):
+        tracker = MultiObjectPTZTracker('127.0.0.1', 80, 'user', 'pass')
+        tracker.update_detections([make_detection(0.5, 0.5, size=0.2)])
+        tracker.current_target_id = 1
+        for i in range(10):
+            tracker._update_auto_zoom(100.0 + i * 0.033)
+        zooms = [c for c in tracker.ptz_service.calls if c[0] == 'AbsoluteMove']
+        self.assertEqual(len(zooms), 1)
+        self.assertEqual(tracker.zoom_change_count, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1141,6 +1141,9 @@ class EnhancedMultiObjectPTZDialog(QDialog):
             self.multi_config.size_weight = self.size_weight.value()
             self.multi_config.proximity_weight = self.proximity_weight.value()
             
+            if self.current_tracker and hasattr(self.current_tracker, 'reload_config'):
+                self.current_tracker.reload_config()
+            
             self._log("⚙️ Configuración actualizada")
 
     def _show_error_dialog(self):